@@ -2,10 +2,18 @@ import pint
 ureg = pint.get_application_registry()
 
 from scippy.source.SCPIDevice import SCPIDevice as SCPIDevice
+from scippy.source.session_pool import ResourceBusyError
 from scippy.source.motor_controller import MotorController
 from scippy.source.Agilent33210A import Agilent33210A as Agilent
 from scippy.source.Keithley2400 import Keithley2400 as Keithley
 from scippy.source.Keithley2635 import Keithley2635 as Keithley2635
 from scippy.source.twos_postprocessing import *
+from scippy.source.RingBuffer import RingBuffer
+from scippy.source.Capture import Capture
+from scippy.source.periodic_processing import PeriodicProcessor, LockInAmplifier, BoxcarAverager, lock_in
+from scippy.source.noise import WelchPSD
+from scippy.source.speed_profiles import SPEED_PROFILES
 from scippy.source.MCP3561 import MCP3561 as MCP
+from scippy.source.MCP3561Simulator import MCP3561Simulator as MCPSimulator
 from scippy.source.TEController import TEController as TEC
+from scippy.source.AsyncSCPIDevice import AsyncSCPIDevice, AsyncKeithley2400 as AsyncKeithley, AsyncMCP3561 as AsyncMCP, AsyncTEController as AsyncTEC
@@ -10,19 +10,22 @@ class Agilent33210A(SCPIDevice):
     MIN_AMPLITUDE = 0.01
 
     def __init__(self, lib_type='pyvisa',
-            device_name='Agilent Technologies,33210A,MY48005679,1.04-1.04-22-2', read_termination='\n', write_termination='\n'):
+            device_name='Agilent Technologies,33210A,MY48005679,1.04-1.04-22-2', read_termination='\n', write_termination='\n',
+            **kwargs):
         """
         Agilent 33210A function generator object
 
         :param device_name: Manufacturer device name
         :param read_termination: Read termination character(s)
         :param write_termination: Write termination character(s)
+        :param kwargs: Additional arguments passed to SCPIDevice
 
         """
         super().__init__(
                 lib_type=lib_type, device_name=device_name,
                 read_termination=read_termination,
-                write_termination=write_termination)
+                write_termination=write_termination,
+                **kwargs)
         self._frequency = 1000*ureg.Hz # Default frequency
         self._amplitude = 0.1*ureg.V
         self._offset_voltage = 0*ureg.V
@@ -119,10 +122,12 @@ class Agilent33210A(SCPIDevice):
         """
         Verifies that our system state matches our believed state.
         """
-        actual_amplitude = self.amplitude
-        actual_frequency = self.frequency
-        actual_output_on = self.output_on
-        actual_offset_voltage = self.offset_voltage
+        actual_amplitude, actual_frequency, actual_output_on, actual_offset_voltage = self.query_many(
+                ['VOLTAGE?', 'FREQUENCY?', 'OUTPUT?', 'VOLTAGE:OFFSET?'],
+                parsers=[float, float, bool, float])
+        actual_amplitude = actual_amplitude * ureg.V
+        actual_frequency = actual_frequency * ureg.Hz
+        actual_offset_voltage = actual_offset_voltage * ureg.V
         if actual_amplitude != self._amplitude:
             raise AssertionError(f'Amplitudes not correct. Actual: {actual_amplitude} vs desired: {self._amplitude}')
         if actual_frequency != self._frequency:
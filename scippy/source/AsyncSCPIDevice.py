@@ -0,0 +1,165 @@
+"""
+asyncio interfaces to SCPI devices, so that slow operations on several devices (an ADC capture, temperature polling, source-meter readings) can overlap.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from scippy.source.SCPIDevice import SCPIDevice
+from scippy.source.Keithley2400 import Keithley2400
+from scippy.source.MCP3561 import MCP3561
+from scippy.source.TEController import TEController
+
+class AsyncSCPIDevice:
+    DEVICE_CLASS = SCPIDevice
+
+    def __init__(self, device, executor=None):
+        """
+        asyncio counterpart of an SCPIDevice. Every call to the wrapped device runs in a worker thread dedicated to that device, so calls to one device are never interleaved with each other, while calls to different devices run concurrently.
+
+        :param device: An open SCPIDevice (or subclass) instance
+        :param executor: Single-threaded executor to run device calls in. Created if not specified.
+        """
+        self.device = device
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=1)
+        self._executor = executor
+
+    @classmethod
+    async def create(cls, *args, **kwargs):
+        """
+        Finds and opens a device without blocking the event loop. Arguments are passed to the constructor of DEVICE_CLASS.
+
+        :returns device: The asynchronous device
+        """
+        executor = ThreadPoolExecutor(max_workers=1)
+        loop = asyncio.get_running_loop()
+        device = await loop.run_in_executor(
+                executor, functools.partial(cls.DEVICE_CLASS, *args, **kwargs))
+        return cls(device, executor=executor)
+
+    async def run(self, function, *args, **kwargs):
+        """
+        Runs a blocking function in this device's worker thread
+
+        :param function: Function to run, typically a method of the wrapped device
+        :returns result: The result of the function
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+                self._executor, functools.partial(function, *args, **kwargs))
+
+    async def get(self, name):
+        """
+        Reads a property of the wrapped device
+
+        :param name: Name of the property
+        """
+        return await self.run(getattr, self.device, name)
+
+    async def set(self, name, value):
+        """
+        Sets a property of the wrapped device
+
+        :param name: Name of the property
+        :param value: Value to set
+        """
+        await self.run(setattr, self.device, name, value)
+
+    async def query(self, string):
+        return await self.run(self.device.query, string)
+
+    async def query_many(self, commands, parsers=None):
+        return await self.run(self.device.query_many, commands, parsers=parsers)
+
+    async def read_line(self):
+        return await self.run(self.device.read_line)
+
+    async def write_line(self, string):
+        await self.run(self.device.write_line, string)
+
+    async def read_bytes(self, n_bytes):
+        return await self.run(self.device.read_bytes, n_bytes)
+
+    async def identify(self):
+        return await self.run(self.device.identify)
+
+    async def reset(self):
+        await self.run(self.device.reset)
+
+    async def close(self):
+        """
+        Closes the wrapped device and its worker thread
+        """
+        await self.run(self.device.close)
+        self._executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+class AsyncKeithley2400(AsyncSCPIDevice):
+    DEVICE_CLASS = Keithley2400
+
+    async def measure(self, measure_mode=None):
+        """
+        Measures the voltage and current. See Keithley2400.measure
+        """
+        return await self.run(self.device.measure, measure_mode)
+
+class AsyncMCP3561(AsyncSCPIDevice):
+    DEVICE_CLASS = MCP3561
+
+    async def measure(self):
+        """
+        Measures raw data from the ADC. See MCP3561.measure
+        """
+        return await self.run(self.device.measure)
+
+    async def measure_sync(self):
+        """
+        Measures raw data and synchronization points in a single exchange. See MCP3561.measure_sync
+        """
+        return await self.run(self.device.measure_sync)
+
+    async def generate_data(self, sync=True, gain=None, as_dataframe=True):
+        """
+        Measures time-series voltage data. See MCP3561.generate_data
+        """
+        return await self.run(self.device.generate_data, sync=sync, gain=gain,
+                              as_dataframe=as_dataframe)
+
+    async def wait_for_motor(self, move_time=0):
+        """
+        Waits for the motor to stop rotating, yielding to the event loop. See MCP3561.wait_for_motor
+
+        :param move_time: Predicted duration (s) of the move
+        """
+        await asyncio.sleep(max(move_time, self.device.MOTOR_SETTLE_TIME))
+        while await self.get('motor_rotating'):
+            await asyncio.sleep(self.device.MOTOR_POLL_INTERVAL)
+
+    async def rotate_motor(self, n_steps):
+        """
+        Rotates the stepper motor by some integer number of steps, yielding to the event loop while the motor rotates.
+
+        :param n_steps: The number of stepper motor steps to take. Positive = clockwise, negative = counterclockwise.
+        """
+        move_time = await self.run(self.device.start_rotation, n_steps)
+        await self.wait_for_motor(move_time)
+
+class AsyncTEController(AsyncSCPIDevice):
+    DEVICE_CLASS = TEController
+
+    async def temperature(self):
+        """
+        Temperature reported by the controller
+        """
+        return await self.get('temperature')
+
+    async def measure_temperature(self):
+        return await self.run(self.device.measure_temperature)
+
+    async def measure_current(self):
+        return await self.run(self.device.measure_current)
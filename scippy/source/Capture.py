@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+from sciparse import to_standard_quantity, quantity_to_title
+from scippy import ureg
+
+class Capture:
+    def __init__(self, voltages, sampling_frequency, sync_indices=None, start_time=0):
+        """
+        Lightweight record of a voltage capture. Holds only the measured voltages and the indices of the synchronization events. The time axis is computed when first accessed, and pint quantities and pandas DataFrames are only built on request.
+
+        :param voltages: Array of voltages in mV
+        :param sampling_frequency: Sampling frequency (Hz) of the voltages
+        :param sync_indices: Array of sample indices at which synchronization events occurred, or None if they were not recorded
+        :param start_time: Time (s) of the first sample
+        """
+        self.voltages = voltages
+        self.sampling_frequency = sampling_frequency
+        self.sync_indices = sync_indices
+        self.start_time = start_time
+        self._times = None
+
+    def __len__(self):
+        return len(self.voltages)
+
+    @property
+    def times(self):
+        """
+        Time (s) of each sample
+        """
+        if self._times is None:
+            self._times = self.start_time + \
+                np.arange(len(self.voltages)) / self.sampling_frequency
+        return self._times
+
+    @property
+    def quantity(self):
+        """
+        Voltages as a pint Quantity in mV
+        """
+        return ureg.Quantity(self.voltages, ureg.mV)
+
+    def sync_column(self):
+        """
+        Dense synchronization column, 1 at each synchronization event and 0 elsewhere
+
+        :returns sync_column: Integer array with one element per sample
+        """
+        sync_column = np.zeros(len(self.voltages), dtype=int)
+        if self.sync_indices is not None:
+            sync_column[self.sync_indices] = 1 # Sync event
+        return sync_column
+
+    def to_dataframe(self, gain=None):
+        """
+        Converts the capture into a pandas DataFrame with time, voltage (or current), and, if synchronization events were recorded, sync columns.
+
+        :param gain: Transimpedance gain (ohm) to convert the voltages into currents, or a dimensionless gain. Voltages are reported if None.
+        :returns data: pandas DataFrame
+        """
+        if gain is None:
+            data = pd.DataFrame(data={
+                'Time (s)': self.times,
+                'Voltage (mV)': self.voltages
+                })
+        else:
+            voltages = self.quantity
+            if to_standard_quantity(gain).units == ureg.ohm:
+                new_data = to_standard_quantity(voltages / gain).to(ureg.nA)
+            elif to_standard_quantity(gain).dimensionless == True:
+                new_data = voltages.m
+
+            title = quantity_to_title(new_data)
+            data = pd.DataFrame(data={
+                'Time (s)': self.times,
+                title: new_data,
+                })
+
+        if self.sync_indices is not None:
+            data['Sync'] = self.sync_column()
+
+        return data
@@ -2,30 +2,87 @@
 
 """
 from scippy import SCPIDevice, ureg
+from scippy.source.speed_profiles import speed_settings, readings_per_second
 import numpy as np
 import pint
 import warnings
 
+def _parse_source_function(reply):
+    if reply.upper().strip('"').startswith('VOLT'):
+        return 'voltage'
+    elif reply.upper().strip('"').startswith('CURR'):
+        return 'current'
+    else:
+        raise ValueError(f'Source function {reply} not recognized.')
+
 class Keithley2400(SCPIDevice):
     COMPLIANCE_CEILING = 9.910000E+37
-
+    VOLTAGE_RANGES = [0.21, 2.1, 21, 210] # Including 5% overrange
+    CURRENT_RANGES = [1.05e-6, 10.5e-6, 105e-6, 1.05e-3, 10.5e-3, 105e-3, 1.05]
+    MAX_SWEEP_POINTS = 2500 # Size of the reading buffer
+    MAX_LIST_POINTS = 100 # Points per source:list command. Longer lists are appended.
+    SWEEP_POINT_TIME = 0.05 # s. Conservative time per sweep point at the default integration time.
+    DATA_FORMATS = {
+        'ascii': ('format:data ascii', None),
+        'sreal': ('format:data sreal', np.dtype('<f4')),
+        'real': ('format:data real,64', np.dtype('<f8')),
+    }
+    ELEMENTS = ['voltage', 'current', 'resistance', 'time', 'status']
+    STATE_QUERIES = {
+        'mode': ('source:function?', _parse_source_function),
+        'voltage': ('source:voltage:level?', float),
+        'current': ('source:current:level?', float),
+        'voltage_compliance': ('sense:voltage:protection:level?', float),
+        'current_compliance': ('sense:current:protection:level?', float),
+        'voltage_range': ('source:voltage:range?', float),
+        'current_range': ('source:current:range?', float),
+        'output_on': ('output:state?', bool),
+    }
+    SETTING_COMMANDS = {
+        'mode': 'source:function {}',
+        'voltage': 'source:voltage:level {}',
+        'current': 'source:current:level {}',
+        'voltage_compliance': 'sense:voltage:protection:level {}',
+        'current_compliance': 'sense:current:protection:level {}',
+        'voltage_range': 'source:voltage:range {}',
+        'current_range': 'source:current:range {}',
+        'output_on': 'output:state {}',
+    }
+    INITIAL_STATE = { # State in which the "write" strategy leaves the instrument. Setting the current last switches it to current mode.
+        'voltage_compliance': 21.0,
+        'current_compliance': 105e-6,
+        'voltage': 0.0,
+        'current': 0.0,
+        'mode': 'current',
+    }
+    SAVED_SETUPS = 5 # Setup memory locations for *SAV and *RCL
+    READING_OVERHEAD = 0.5e-3 # s. Time per reading beyond integration, with the display off.
 
     def __init__(self, lib_type='pyvisa',
             device_name='KEITHLEY INSTRUMENTS INC.,MODEL 2400,1207317,C30   Mar 17 2006 09:29:29/A02  /K/J', resource_name='',
-            read_termination='\r', write_termination='\r', baud_rate=57600):
+            read_termination='\r', write_termination='\r', baud_rate=57600,
+            data_format='ascii', elements=('voltage', 'current'),
+            init_strategy='write', setup=0, speed=None, **kwargs):
         """
         Keithley 2400 measurement
 
         :param device_name: Manufacturer device name
         :param read_termination: Read termination character(s)
         :param write_termination: Write termination character(s)
+        :param data_format: Format in which readings are transferred. See data_format
+        :param elements: Elements returned with each reading. See elements
+        :param init_strategy: How to configure the instrument. "write" writes every initial setting. "lazy" reads the instrument state in a single exchange and writes only the settings which differ from INITIAL_STATE, see apply_state(). "recall" recalls a setup saved with save_setup().
+        :param setup: Setup memory location to recall with the "recall" strategy
+        :param speed: Speed profile to apply, see set_speed(). The instrument's settings are left as they are if None.
+        :param kwargs: Additional arguments passed to SCPIDevice
 
         """
         super().__init__(
                 lib_type=lib_type, device_name=device_name,
                 read_termination=read_termination,
                 write_termination=write_termination,
-                baud_rate=baud_rate, resource_name=resource_name)
+                baud_rate=baud_rate, resource_name=resource_name,
+                **kwargs)
 
         self._mode = 'voltage'
         self._current_compliance = 105.0*ureg.uA
@@ -34,19 +91,126 @@ class Keithley2400(SCPIDevice):
         self._current = 0*ureg.mA
         self._current_range = 0*ureg.A
         self._voltage_range = 0*ureg.V
+        self._speed_settings = speed_settings('normal')
+
+        if init_strategy == 'write':
+            with self.batch():
+                self.data_format = data_format
+                self.elements = elements
+                self.mode = self._mode
+                self.current_compliance = self._current_compliance
+                self.voltage_compliance = self._voltage_compliance
+                self.voltage_range = self.voltage_range
+                self.current_range = self.current_range
+                self.voltage = self._voltage
+                self.current = self._current
+        elif init_strategy == 'lazy':
+            with self.batch():
+                self.data_format = data_format
+                self.elements = elements
+                self.apply_state(self.INITIAL_STATE)
+        elif init_strategy == 'recall':
+            self._data_format = data_format # Sent by recall_setup() after the recall
+            self._elements = elements
+            self.recall_setup(setup)
+        else:
+            raise ValueError(f'Initialization strategy {init_strategy} not recognized. Available strategies are "write", "lazy", and "recall"')
+        if speed is not None:
+            self.speed = speed
+
+    def apply_state(self, state):
+        """
+        Brings the instrument to the given settings. Reads every setting in a single exchange, then writes only the settings which differ, in a single batch.
+
+        :param state: Dictionary of {setting: value} with any of the keys of STATE_QUERIES. Voltages in V and currents in A, or pint quantities.
+        """
+        was_caching = self.cache_state
+        self.cache_state = True # The mirror skips settings which already have the desired value
+        try:
+            self.refresh()
+            with self.batch():
+                for key, value in state.items():
+                    if isinstance(value, pint.Quantity):
+                        value = value.to(ureg.A if 'current' in key else ureg.V).m
+                    if key == 'voltage_range':
+                        value = self._select_range(value, self.VOLTAGE_RANGES)
+                        self._voltage_range = value * ureg.V
+                    elif key == 'current_range':
+                        value = self._select_range(value, self.CURRENT_RANGES)
+                        self._current_range = value * ureg.A
+                    elif key != 'output_on':
+                        setattr(self, '_' + key, value)
+                    command_value = int(value) if isinstance(value, bool) else value
+                    self.cached_write(
+                            key, value,
+                            self.SETTING_COMMANDS[key].format(command_value))
+        finally:
+            self.cache_state = was_caching
+            if not was_caching:
+                self.invalidate()
+
+    def save_setup(self, setup=0):
+        """
+        Saves the present settings in the instrument's setup memory, to be restored with recall_setup() or the "recall" initialization strategy.
+
+        :param setup: Setup memory location, 0 to SAVED_SETUPS - 1
+        """
+        self._check_setup(setup)
+        self.write_line(f'*SAV {setup}')
+
+    def recall_setup(self, setup=0):
+        """
+        Restores settings saved with save_setup(), and re-reads them into the state mirror. The data format and elements are sent again after the recall, since the saved setup may have changed them.
+
+        :param setup: Setup memory location, 0 to SAVED_SETUPS - 1
+        """
+        self._check_setup(setup)
+        with self.batch():
+            self.write_line(f'*RCL {setup}')
+            self.data_format = self._data_format
+            self.elements = self._elements
+        self.refresh()
+        if not self.cache_state:
+            self.invalidate()
+
+    def _check_setup(self, setup):
+        """
+        Raises a ValueError if the setup memory location does not exist
+        """
+        if setup not in range(self.SAVED_SETUPS):
+            raise ValueError(f'Setup {setup} not available. Setups are 0 to {self.SAVED_SETUPS - 1}.')
+
+    def read_state(self):
+        """
+        Reads the source, compliance, range, and output settings in a single exchange.
 
-        self.mode = self._mode
-        self.current_compliance = self._current_compliance
-        self.voltage_compliance = self._voltage_compliance
-        self.voltage_range = self.voltage_range
-        self.current_range = self.current_range
-        self.voltage = self._voltage
-        self.current = self._current
+        :returns state: Dictionary with keys mode, voltage, current, voltage_compliance, current_compliance, voltage_range, current_range, and output_on
+        """
+        state = self.refresh()
+        for key in ['voltage', 'voltage_compliance', 'voltage_range']:
+            state[key] = state[key] * ureg.V
+        for key in ['current', 'current_compliance', 'current_range']:
+            state[key] = state[key] * ureg.A
+        return state
+
+    def refresh(self):
+        """
+        Re-reads the device settings into the state mirror, and updates the source mode, ranges, and compliances used by the setters and measurements.
+
+        :returns state: Dictionary of {setting: value}
+        """
+        state = super().refresh()
+        self._mode = state['mode']
+        self._voltage_compliance = state['voltage_compliance']
+        self._current_compliance = state['current_compliance']
+        self._voltage_range = state['voltage_range'] * ureg.V
+        self._current_range = state['current_range'] * ureg.A
+        return state
 
     @property
     @ureg.wraps(ureg.V, None, False)
     def voltage(self):
-        volt = float(self.query('source:voltage:level?'))
+        volt = self.cached_query('voltage', 'source:voltage:level?', float)
         return volt
 
     @voltage.setter
@@ -59,12 +223,12 @@ class Keithley2400(SCPIDevice):
             voltage_to_compare = voltage* ureg.V
         if voltage_to_compare > self._voltage_range:
             self.voltage_range = voltage
-        self.write_line(f'source:voltage:level {voltage}')
+        self.cached_write('voltage', voltage, f'source:voltage:level {voltage}')
 
     @property
     @ureg.wraps(ureg.A, None, False)
     def current(self):
-        current = float(self.query('source:current:level?'))
+        current = self.cached_query('current', 'source:current:level?', float)
         return current
 
     @current.setter
@@ -78,7 +242,7 @@ class Keithley2400(SCPIDevice):
         if current_to_compare > self._current_range:
             self.current_range = current
 
-        self.write_line(f'source:current:level {current}')
+        self.cached_write('current', current, f'source:current:level {current}')
 
     @property
     def mode(self):
@@ -87,61 +251,63 @@ class Keithley2400(SCPIDevice):
     @mode.setter
     def mode(self, mode):
         if mode == 'voltage':
-            self.write_line('source:function voltage')
+            self.cached_write('mode', mode, 'source:function voltage')
             self._mode = mode
         elif mode == 'current':
-            self.write_line('source:function current')
+            self.cached_write('mode', mode, 'source:function current')
             self._mode = mode
         else:
             raise ValueError(f'Mode {mode} not recognized. Available modes are "voltage" and "current"')
 
     @property
     def output_on(self):
-        output_state = self.query('output:state?')
-        if output_state == '0':
-            output_state = False
-        elif output_state == '1':
-            output_state = True
-
+        output_state = self.cached_query('output_on', 'output:state?', bool)
         return output_state
 
     @output_on.setter
     def output_on(self, output):
         if output == True:
-            self.write_line('output:state on')
+            self.cached_write('output_on', True, 'output:state on')
         elif output == False:
-            self.write_line('output:state off')
+            self.cached_write('output_on', False, 'output:state off')
         else:
             raise ValueError(f'Output state {output} not recognized. Available values are True and False')
 
     @property
     @ureg.wraps(ureg.A, None, False)
     def current_compliance(self):
-        compliance = float(self.query('sense:current:protection:level?'))
+        compliance = self.cached_query(
+                'current_compliance', 'sense:current:protection:level?', float)
         return compliance
 
     @current_compliance.setter
     @ureg.wraps(None, (None, ureg.A), False)
     def current_compliance(self, compliance):
         self._current_compliance = compliance
-        self.write_line(f'sense:current:protection:level {compliance}')
+        self.cached_write(
+                'current_compliance', compliance,
+                f'sense:current:protection:level {compliance}')
 
     @property
     @ureg.wraps(ureg.V, None, False)
     def voltage_compliance(self):
-        compliance = float(self.query('sense:voltage:protection:level?'))
+        compliance = self.cached_query(
+                'voltage_compliance', 'sense:voltage:protection:level?', float)
         return compliance
 
     @voltage_compliance.setter
     @ureg.wraps(None, (None, ureg.V), False)
     def voltage_compliance(self, compliance):
         self._voltage_compliance = compliance
-        self.write_line(f'sense:voltage:protection:level {compliance}')
+        self.cached_write(
+                'voltage_compliance', compliance,
+                f'sense:voltage:protection:level {compliance}')
 
     @property
     @ureg.wraps(ureg.V, None, False)
     def voltage_range(self):
-        voltage_range = float(self.query('source:voltage:range?'))
+        voltage_range = self.cached_query(
+                'voltage_range', 'source:voltage:range?', float)
         return voltage_range
 
     @voltage_range.setter
@@ -150,14 +316,22 @@ class Keithley2400(SCPIDevice):
         if isinstance(voltage, pint.Quantity):
             voltage = voltage.to(ureg.V).m
         range_string = f'source:voltage:range {voltage}'
-        self.write_line(range_string)
-        actual_range = self.voltage_range
-        self._voltage_range = actual_range
+        if self.cache_state:
+            # The instrument selects the lowest range that fits, so the range can be mirrored without reading it back.
+            actual_range = self._select_range(voltage, self.VOLTAGE_RANGES)
+            self.cached_write('voltage_range', actual_range, range_string)
+            self._voltage_range = actual_range * ureg.V
+        else:
+            self.write_line(range_string)
+            self.invalidate('voltage_range')
+            actual_range = self.voltage_range
+            self._voltage_range = actual_range
 
     @property
     @ureg.wraps(ureg.A, None, False)
     def current_range(self):
-        current_range = float(self.query('source:current:range?'))
+        current_range = self.cached_query(
+                'current_range', 'source:current:range?', float)
         return current_range
 
     @current_range.setter
@@ -166,9 +340,25 @@ class Keithley2400(SCPIDevice):
         if isinstance(current, pint.Quantity):
             current = current.to(ureg.A).m
         range_string = f'source:current:range {current}'
-        self.write_line(range_string)
-        actual_range = self.current_range
-        self._current_range = actual_range
+        if self.cache_state:
+            actual_range = self._select_range(current, self.CURRENT_RANGES)
+            self.cached_write('current_range', actual_range, range_string)
+            self._current_range = actual_range * ureg.A
+        else:
+            self.write_line(range_string)
+            self.invalidate('current_range')
+            actual_range = self.current_range
+            self._current_range = actual_range
+
+    @staticmethod
+    def _select_range(value, available_ranges):
+        """
+        The lowest of the available ranges which can source the given value
+        """
+        for available_range in available_ranges:
+            if abs(value) <= available_range:
+                return available_range
+        return available_ranges[-1]
 
     @property
     def at_compliance_limit(self):
@@ -178,32 +368,225 @@ class Keithley2400(SCPIDevice):
             compliance_tripped = bool(float(self.query('sense:current:protection:tripped?')))
         return compliance_tripped
 
+    @property
+    def data_format(self):
+        """
+        Format in which readings are transferred: "ascii", or the binary formats "sreal" (32-bit float) or "real" (64-bit float). Binary readings are about a third of the size of ASCII readings and are decoded without parsing. Binary readings are sent least significant byte first.
+        """
+        return self._data_format
+
+    @data_format.setter
+    def data_format(self, data_format):
+        if data_format not in self.DATA_FORMATS:
+            raise ValueError(f'Data format {data_format} not recognized. Available formats are {list(self.DATA_FORMATS.keys())}')
+        self.write_line(self.DATA_FORMATS[data_format][0])
+        if data_format != 'ascii':
+            self.write_line('format:border swapped')
+        self._data_format = data_format
+
+    @property
+    def elements(self):
+        """
+        Elements returned with each reading, in the order they are returned. Any of "voltage", "current", "resistance", "time", and "status".
+        """
+        return self._elements
+
+    @elements.setter
+    def elements(self, elements):
+        elements = [element for element in self.ELEMENTS if element in elements]
+        self.write_line('format:elements ' + ','.join(elements))
+        self._elements = elements
+
     def measure(self, measure_mode=None):
         """
-        Returns the measured current if in voltage mode and the measured current if in voltage mode, along with the set voltage in voltage mode or the set current in current mode
+        Returns the measured current if in voltage mode and the measured current if in voltage mode, along with the set voltage in voltage mode or the set current in current mode. Elements which are not selected (see elements) are returned as NaN.
         """
         if measure_mode is None:
             if self._mode == 'voltage':
                 measure_mode = 'current'
             elif self._mode == 'current':
                 measure_mode = 'voltage'
-        if measure_mode == 'voltage':
-            result = self.query('measure:voltage?')
-        elif measure_mode == 'current':
-            result = self.query('measure:current?')
-        else:
+        if measure_mode not in ['voltage', 'current']:
             raise ValueError(f'Invalid measurement mode {measure_mode}. Available modes are "current" and "voltage".')
 
-        numerical_results = [float(x) for x in result.split(',')]
-        voltage = numerical_results[0]*ureg.V
-        current = numerical_results[1]*ureg.A
+        numerical_results = np.concatenate(self._columns(
+            self._read_readings(f'measure:{measure_mode}?'), ['voltage', 'current']))
+        voltage_at_ceiling, current_at_ceiling = self._at_ceiling(numerical_results)
+        voltage = float(numerical_results[0])*ureg.V
+        current = float(numerical_results[1])*ureg.A
 
-        if voltage.m == self.COMPLIANCE_CEILING:
+        if voltage_at_ceiling:
             voltage = self._voltage_compliance*ureg.V
             warnings.warn(f'Warning: voltage at compliance limit of {voltage}.', UserWarning)
-        if current.m == self.COMPLIANCE_CEILING:
+        if current_at_ceiling:
             current = self._current_compliance*ureg.A
             warnings.warn(f'Warning: current at compliance limit of {current}', UserWarning)
 
         return voltage, current
 
+
+    def sweep(self, levels, mode='voltage', spacing='list', timeout=None):
+        """
+        Runs a sweep on the instrument using its built-in sweep and trigger model, and reads back every reading in one transfer. Much faster than setting and measuring each point in turn. The output state and elements are restored afterwards.
+
+        :param levels: Array of source levels (V or A). For linear and log sweeps, only the first and last levels and the number of levels are sent, so they should come from np.linspace or np.geomspace.
+        :param mode: Source function, "voltage" or "current"
+        :param spacing: "list" to source the levels as given, or "linear" or "log" for a staircase sweep from the first to the last level
+        :param timeout: Time (s) to wait for the sweep to finish. Estimated from the number of levels if None.
+        :returns voltages, currents, at_compliance: Arrays of the measured voltages (V) and currents (A), and whether each reading was at the compliance limit. Readings at the limit are replaced by the compliance value.
+        """
+        levels = np.asarray(levels, dtype=np.float64)
+        n_points = len(levels)
+        if n_points > self.MAX_SWEEP_POINTS:
+            raise ValueError(f'Sweep of {n_points} points is longer than the maximum of {self.MAX_SWEEP_POINTS} points.')
+        if mode == 'voltage':
+            source, sense = 'voltage', 'current'
+        elif mode == 'current':
+            source, sense = 'current', 'voltage'
+        else:
+            raise ValueError(f'Mode {mode} not recognized. Available modes are "voltage" and "current"')
+        elements = self._elements
+        output_on = self.output_on
+
+        with self.batch():
+            self.mode = mode
+            self.write_line(f'sense:function "{sense}"')
+            if spacing == 'list':
+                self.write_line(f'source:{source}:mode list')
+                for i in range(0, n_points, self.MAX_LIST_POINTS):
+                    command = 'source:list:' + source + (':append ' if i else ' ')
+                    self.write_line(command + ','.join(
+                        repr(float(level)) for level in levels[i:i + self.MAX_LIST_POINTS]))
+            elif spacing in ['linear', 'log']:
+                self.write_line(f'source:{source}:mode sweep')
+                self.write_line(f'source:{source}:start {float(levels[0])!r}')
+                self.write_line(f'source:{source}:stop {float(levels[-1])!r}')
+                self.write_line(f'source:sweep:points {n_points}')
+                self.write_line(f'source:sweep:spacing {spacing}')
+            else:
+                raise ValueError(f'Spacing {spacing} not recognized. Available spacings are "list", "linear", and "log"')
+            self.write_line('source:sweep:ranging best')
+            self.write_line(f'trigger:count {n_points}')
+            self.elements = ['voltage', 'current']
+            self.output_on = True
+
+        if timeout is None:
+            timeout = 2 + n_points * self.SWEEP_POINT_TIME
+        old_timeout = self.timeout
+        self.timeout = timeout
+        try:
+            readings = self._read_readings('read?', n_readings=n_points)
+            voltages, currents = self._columns(readings, ['voltage', 'current'])
+        finally:
+            self.timeout = old_timeout
+            with self.batch():
+                self.write_line(f'source:{source}:mode fixed')
+                self.write_line('trigger:count 1')
+                if elements != self._elements:
+                    self.elements = elements
+                self.output_on = output_on
+            self.invalidate(source)
+
+        return self._replace_compliance(voltages, currents)
+
+    def _read_readings(self, command, n_readings=1):
+        """
+        Sends a command which returns readings, such as read? or measure:current?, and reads back every reading in the current data format. Binary readings are decoded straight from the received bytes. These commands turn the output on, so the output state is removed from the state mirror.
+
+        :param command: Command to send
+        :param n_readings: Number of readings the command returns
+        :returns readings: Flat array of the readings, with the elements of each reading in the order of elements
+        """
+        dtype = self.DATA_FORMATS[self._data_format][1]
+        self.invalidate('output_on')
+        if dtype is None:
+            reply = self.query(command)
+            return np.array(reply.split(','), dtype=np.float64)
+
+        self.write_line(command)
+        n_values = n_readings * len(self._elements)
+        readings = self.read_binary_block(
+                dtype, length_header=True, n_bytes=n_values * dtype.itemsize)
+        self.read_bytes(len(self.read_termination))
+        return readings
+
+    def _columns(self, readings, names):
+        """
+        Picks elements out of a flat array of readings
+
+        :param readings: Flat array of readings, see _read_readings()
+        :param names: Elements to pick
+        :returns columns: List with an array per element, in the order of names. Elements which are not selected are filled with NaN.
+        """
+        readings = readings.reshape(-1, len(self._elements))
+        return [readings[:, self._elements.index(name)].copy() if name in self._elements
+                else np.full(len(readings), np.nan, dtype=readings.dtype)
+                for name in names]
+
+    def _at_ceiling(self, readings):
+        """
+        Whether each reading is at the compliance ceiling, which the instrument returns in place of readings at the compliance limit. Compared at the precision of the readings, as the ceiling is not exactly representable in single precision.
+        """
+        return readings == readings.dtype.type(self.COMPLIANCE_CEILING)
+
+    def _replace_compliance(self, voltages, currents):
+        """
+        Replaces readings at the compliance ceiling with the compliance value
+
+        :returns voltages, currents, at_compliance: Arrays of voltages and currents, and a boolean array of which readings were at the compliance limit
+        """
+        voltage_at_compliance = self._at_ceiling(voltages)
+        current_at_compliance = self._at_ceiling(currents)
+        voltages[voltage_at_compliance] = self._voltage_compliance
+        currents[current_at_compliance] = self._current_compliance
+        at_compliance = voltage_at_compliance | current_at_compliance
+        if np.any(at_compliance):
+            warnings.warn(f'Warning: {np.count_nonzero(at_compliance)} of {len(at_compliance)} readings at compliance limit.', UserWarning)
+        return voltages, currents, at_compliance
+
+    @property
+    def speed(self):
+        """
+        Settings of the last speed profile applied. Set to "fast", "normal", or "hi_accuracy", or use set_speed() to override individual settings.
+        """
+        return self._speed_settings
+
+    @speed.setter
+    def speed(self, profile):
+        self.set_speed(profile)
+
+    def set_speed(self, profile='normal', **overrides):
+        """
+        Sets the integration time, autozero, display, filter, source delay, and measurement autorange together.
+
+        :param profile: "fast", "normal", or "hi_accuracy"
+        :param overrides: Settings which replace those of the profile. See speed_profiles.speed_settings
+        """
+        settings = speed_settings(profile, **overrides)
+        on_off = lambda value: 'on' if value else 'off'
+        with self.batch():
+            self.write_line(f'sense:current:nplcycles {settings["nplc"]}')
+            self.write_line(f'sense:voltage:nplcycles {settings["nplc"]}')
+            self.write_line(f'system:azero {on_off(settings["autozero"])}')
+            self.write_line(f'display:enable {on_off(settings["display"])}')
+            if settings['filter_count'] > 0:
+                self.write_line('sense:average:tcontrol repeat')
+                self.write_line(f'sense:average:count {settings["filter_count"]}')
+            self.write_line(f'sense:average {on_off(settings["filter_count"] > 0)}')
+            if settings['source_delay'] is None:
+                self.write_line('source:delay:auto on')
+            else:
+                self.write_line(f'source:delay {settings["source_delay"]}')
+            self.write_line(f'sense:current:range:auto {on_off(settings["autorange"])}')
+            self.write_line(f'sense:voltage:range:auto {on_off(settings["autorange"])}')
+        self._speed_settings = settings
+
+    def readings_per_second(self, line_frequency=60):
+        """
+        Rough estimate of the readings per second with the present speed settings. See speed_profiles.readings_per_second
+
+        :param line_frequency: Power line frequency (Hz)
+        """
+        return readings_per_second(
+                self._speed_settings, line_frequency=line_frequency,
+                overhead=self.READING_OVERHEAD)
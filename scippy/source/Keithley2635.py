@@ -2,31 +2,67 @@
 
 """
 from scippy import SCPIDevice, ureg
+from scippy.source.speed_profiles import speed_settings, readings_per_second
 import numpy as np
 import pint
 import warnings
+import hashlib
 
 class Keithley2635(SCPIDevice):
     COMPLIANCE_CEILING = 9.910000E+37
-
+    RESPONSE_SEPARATOR = None
+    READING_OVERHEAD = 0.1e-3 # s. Time per reading beyond integration.
+    LEVELS_PER_MESSAGE = 10 # Sweep levels sent per message when loading a sweep
+    SWEEP_SCRIPT = """scippy_levels = {}
+function %(function)s_append(values)
+    for i = 1, table.getn(values) do
+        table.insert(scippy_levels, values[i])
+    end
+end
+function %(function)s(source_voltage)
+    smua.nvbuffer1.clear()
+    smua.nvbuffer2.clear()
+    smua.nvbuffer1.appendmode = 1
+    smua.nvbuffer2.appendmode = 1
+    if source_voltage then
+        smua.source.func = smua.OUTPUT_DCVOLTS
+    else
+        smua.source.func = smua.OUTPUT_DCAMPS
+    end
+    smua.source.output = smua.OUTPUT_ON
+    for i = 1, table.getn(scippy_levels) do
+        if source_voltage then
+            smua.source.levelv = scippy_levels[i]
+        else
+            smua.source.leveli = scippy_levels[i]
+        end
+        smua.measure.iv(smua.nvbuffer1, smua.nvbuffer2)
+    end
+    waitcomplete()
+    printbuffer(1, smua.nvbuffer1.n, smua.nvbuffer1.readings, smua.nvbuffer2.readings)
+end"""
 
     def __init__(self, lib_type='pyvisa',
             device_name='Keithley Instruments Inc., Model 2635, 1212537, 1.4.1',
             resource_name='',
-            read_termination='\n', write_termination='\n', baud_rate=57600):
+            read_termination='\n', write_termination='\n', baud_rate=57600,
+            speed=None, **kwargs):
         """
         Keithley 2635 measurement device
 
         :param device_name: Manufacturer device name
         :param read_termination: Read termination character(s)
         :param write_termination: Write termination character(s)
+        :param speed: Speed profile to apply, see set_speed(). The instrument's settings are left as they are if None.
+        :param kwargs: Additional arguments passed to SCPIDevice
 
         """
         super().__init__(
                 lib_type=lib_type, device_name=device_name,
                 read_termination=read_termination,
                 write_termination=write_termination,
-                baud_rate=baud_rate, resource_name=resource_name)
+                baud_rate=baud_rate, resource_name=resource_name,
+                **kwargs)
 
         self._mode = 'voltage'
         self._current_compliance = 105.0*ureg.uA
@@ -35,6 +71,11 @@ class Keithley2635(SCPIDevice):
         self._current = 0*ureg.mA
         self._current_range = 0*ureg.A
         self._voltage_range = 0*ureg.V
+        self._speed_settings = speed_settings('normal')
+        self._loaded_scripts = set()
+        self._buffer_capacity = None
+        if speed is not None:
+            self.speed = speed
 
 #self.mode = self._mode
 #self.current_compliance = self._current_compliance
@@ -186,6 +227,12 @@ class Keithley2635(SCPIDevice):
         else:
             raise ValueError('Got unknown compliance value {result}.')
 
+    def command_separator(self, command):
+        """
+        TSP commands are Lua statements, which are separated by whitespace rather than SCPI semicolons.
+        """
+        return ' '
+
     def measure(self, measure_mode=None):
         """
         Returns the measured current if in voltage mode and the measured current if in voltage mode, along with the set voltage in voltage mode or the set current in current mode
@@ -194,3 +241,129 @@ class Keithley2635(SCPIDevice):
         current, voltage = [float(x) for x in result.split('\t')]
 
         return voltage*ureg.V, current*ureg.A
+
+    @property
+    def speed(self):
+        """
+        Settings of the last speed profile applied. Set to "fast", "normal", or "hi_accuracy", or use set_speed() to override individual settings.
+        """
+        return self._speed_settings
+
+    @speed.setter
+    def speed(self, profile):
+        self.set_speed(profile)
+
+    def set_speed(self, profile='normal', **overrides):
+        """
+        Sets the integration time, autozero, filter, source delay, and measurement autorange of channel A together. The display setting is recorded but not sent, as the 2635 has no command to stop updating the display.
+
+        :param profile: "fast", "normal", or "hi_accuracy"
+        :param overrides: Settings which replace those of the profile. See speed_profiles.speed_settings
+        """
+        settings = speed_settings(profile, **overrides)
+        with self.batch():
+            self.write_line(f'smua.measure.nplc = {settings["nplc"]}')
+            if settings['autozero']:
+                self.write_line('smua.measure.autozero = smua.AUTOZERO_AUTO')
+            else:
+                self.write_line('smua.measure.autozero = smua.AUTOZERO_OFF')
+            if settings['filter_count'] > 0:
+                self.write_line('smua.measure.filter.type = smua.FILTER_REPEAT_AVG')
+                self.write_line(f'smua.measure.filter.count = {settings["filter_count"]}')
+                self.write_line('smua.measure.filter.enable = smua.FILTER_ON')
+            else:
+                self.write_line('smua.measure.filter.enable = smua.FILTER_OFF')
+            if settings['source_delay'] is None:
+                self.write_line('smua.source.delay = smua.DELAY_AUTO')
+            else:
+                self.write_line(f'smua.source.delay = {settings["source_delay"]}')
+            autorange = 'smua.AUTORANGE_ON' if settings['autorange'] else 'smua.AUTORANGE_OFF'
+            self.write_line(f'smua.measure.autorangei = {autorange}')
+            self.write_line(f'smua.measure.autorangev = {autorange}')
+        self._speed_settings = settings
+
+    def readings_per_second(self, line_frequency=60):
+        """
+        Rough estimate of the readings per second with the present speed settings. See speed_profiles.readings_per_second
+
+        :param line_frequency: Power line frequency (Hz)
+        """
+        return readings_per_second(
+                self._speed_settings, line_frequency=line_frequency,
+                overhead=self.READING_OVERHEAD)
+
+    def sweep(self, levels, mode='voltage', timeout=None):
+        """
+        Runs a sweep of channel A entirely on the instrument and reads back every reading in one transfer. The sweep runs in a TSP script which is loaded once and reused by later sweeps, and stores its readings in smua.nvbuffer1 (current) and smua.nvbuffer2 (voltage). The compliance limit of the sensed quantity is set from current_compliance or voltage_compliance, and the output state is restored afterwards.
+
+        :param levels: Array of source levels (V or A)
+        :param mode: Source function, "voltage" or "current"
+        :param timeout: Time (s) to wait for the sweep to finish. Estimated from the speed settings if None.
+        :returns voltages, currents: Arrays of the measured voltages (V) and currents (A)
+        """
+        if mode not in ['voltage', 'current']:
+            raise ValueError(f'Mode {mode} not recognized. Available modes are "voltage" and "current"')
+        levels = np.asarray(levels, dtype=np.float64)
+        capacity = self.buffer_capacity
+        if len(levels) > capacity:
+            raise ValueError(f'Sweep of {len(levels)} points is longer than the reading buffer capacity of {capacity} points.')
+        function = self.load_script(self.SWEEP_SCRIPT)
+        output_on = self.output_on
+
+        with self.batch():
+            if mode == 'voltage':
+                self.current_compliance = self._current_compliance
+            else:
+                self.voltage_compliance = self._voltage_compliance
+            self.write_line('scippy_levels = {}')
+            for i in range(0, len(levels), self.LEVELS_PER_MESSAGE):
+                values = ','.join(repr(float(level)) for level in levels[i:i + self.LEVELS_PER_MESSAGE])
+                self.write_line(f'{function}_append({{{values}}})')
+        self._mode = mode
+
+        if timeout is None:
+            timeout = 2 + 2 * len(levels) / self.readings_per_second()
+        old_timeout = self.timeout
+        self.timeout = timeout
+        try:
+            reply = self.query(f'{function}({str(mode == "voltage").lower()})')
+        finally:
+            self.timeout = old_timeout
+            self.output_on = output_on
+
+        readings = np.array(reply.split(','), dtype=np.float64).reshape(-1, 2)
+        return readings[:, 1].copy(), readings[:, 0].copy()
+
+    @property
+    def buffer_capacity(self):
+        """
+        Number of readings smua.nvbuffer1 can hold, which limits the length of a sweep. Queried once and then remembered.
+        """
+        if self._buffer_capacity is None:
+            self._buffer_capacity = int(float(self.query('print(smua.nvbuffer1.capacity)')))
+        return self._buffer_capacity
+
+    def load_script(self, script):
+        """
+        Loads a TSP script which defines functions, unless it is already loaded. The script is named by the hash of its text, so a script is only loaded once per instrument power cycle, and changed scripts are loaded under a new name.
+
+        :param script: Text of the script. Occurrences of %(function)s are replaced by a function name unique to the script.
+        :returns function: Unique function name substituted into the script
+        """
+        script_hash = hashlib.sha1(script.encode()).hexdigest()[:12]
+        function = f'scippy_{script_hash}'
+        if function in self._loaded_scripts:
+            return function
+        if self.query(f'print({function} ~= nil)') != 'true':
+            name = f'Scippy_{script_hash}'
+            batch_queue, self._batch_queue = self._batch_queue, None # loadscript needs each line as its own message
+            try:
+                self.write_line(f'loadscript {name}')
+                for line in (script % {'function': function}).split('\n'):
+                    self.write_line(line)
+                self.write_line('endscript')
+                self.write_line(f'{name}()') # Running the script defines its functions
+            finally:
+                self._batch_queue = batch_queue
+        self._loaded_scripts.add(function)
+        return function
@@ -2,17 +2,28 @@
 
 """
 import pyvisa
-from sciparse import to_standard_quantity, quantity_to_title
 from scippy import SCPIDevice, twos_to_voltage, twos_to_integer, MotorController, ureg
+from scippy.source.RingBuffer import RingBuffer
+from scippy.source.Capture import Capture
 import os
 import numpy as np
-import pandas as pd
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import warnings
 
 class MCP3561(SCPIDevice, MotorController):
+    SUPPORTS_COMPOUND_COMMANDS = False
+    STATE_QUERIES = {
+        'motor_enable': ('MOTOR:ENABLED?', bool),
+    }
+    TIMEOUT_MARGIN = 0.5 # s. Allowance for USB latency on top of the time taken to sample a chunk.
+    MIN_SYNC_PERIOD = 10 # Shortest synchronization period, in samples, for which the acquisition keeps every sync index in its buffer
+
     def __init__(self, lib_type='pyserial',
             device_name='MCP3561 Dev Board v1', read_termination='\r\n', write_termination='\n', sampling_frequency=9765.65,
-            n_samples=1, offset_voltage=3.12512):
+            n_samples=1, offset_voltage=3.12512, combined_sync=False,
+            **kwargs):
         """
         Implementation of communication device for the MCP3561 ADC and an accompanying development board.
 
@@ -23,17 +34,22 @@ class MCP3561(SCPIDevice, MotorController):
         :param n_samples: Number of samples to take
         :param offset_voltage: Calibrated zero-point voltage.
         :param sampling_frequency: Sampling frequency of the device. Not currently settable.
+        :param combined_sync: Whether the firmware supports MEASURE:SYNC?, which returns the samples and synchronization points in a single exchange. See measure_sync()
+        :param kwargs: Additional arguments passed to SCPIDevice
 
         """
         self.lib_type = lib_type
         super().__init__(lib_type=lib_type, device_name=device_name,
                 read_termination=read_termination,
-                write_termination=write_termination)
+                write_termination=write_termination,
+                **kwargs)
         self._n_samples = n_samples
         self._n_bytes = n_samples * 3 + 1
         self._n_synchronization_pulses = 0
         self.sampling_frequency = sampling_frequency
         self.offset_voltage = offset_voltage
+        self.combined_sync = combined_sync
+        self._acquisition_thread = None
 
         self._microsteps_per_nm = 30.3716*1.011 # calibrated from 800nm - 1700nm. Optimized for 5nm steps.
         self._microsteps_correction = -6.17*1e-6
@@ -45,6 +61,13 @@ class MCP3561(SCPIDevice, MotorController):
         else:
              self._wavelength = 850
 
+    def reset(self):
+        """
+        Resets the device, forgetting the motor period kept locally
+        """
+        super().reset()
+        self._motor_period = None
+
     @property
     def n_samples(self):
         """
@@ -59,34 +82,65 @@ class MCP3561(SCPIDevice, MotorController):
             self._n_bytes= n_samples*3 + 1
             self.write_line('CONFIGURE ' + str(n_samples))
 
-    def measure(self):
+    def measure(self, out=None, progress=None, chunk_samples=10000):
         """
-        Measures data from the MCP dev board.
+        Measures data from the MCP dev board. Large captures are read in chunks of chunk_samples samples, each with a timeout derived from the sampling frequency. If the device stops sending before the capture is complete, the samples received so far are returned with a warning.
 
+        :param out: Preallocated uint8 array of at least 3*n_samples bytes to read the data into
+        :param progress: Function called as progress(n_read, n_samples) with the number of samples read so far, after every chunk
+        :param chunk_samples: Maximum number of samples per read
         :returns byte_array: Raw array of bytes as measured by the MCP
         """
-        old_timeout = self.device.timeout
-        measurement_time_ms = 1000*self._n_samples / self.sampling_frequency
-        if(measurement_time_ms > self.device.timeout - 100):
-            self.device.timeout = measurement_time_ms + 100
+        self.write_line('MEASURE?')
+        return self._read_samples(
+                out=out, progress=progress, chunk_samples=chunk_samples)
 
-        bytes_written = self.write_line('MEASURE?')
-        measured_data = self.read_bytes(self._n_bytes)
+    def measure_sync(self, out=None, progress=None, chunk_samples=10000):
+        """
+        Measures data and the synchronization points of the measurement in a single exchange, instead of the three taken by measure(), sync_points() and sync_data(). The device replies to MEASURE:SYNC? with the same # and samples as to MEASURE?, immediately followed by the synchronization indices as a definite-length binary block (#<n><length><indices>). Requires firmware support, see combined_sync.
 
-        if len(measured_data) == 0:
-            raise ValueError(f"No data measured from device. Attempted to read {self._n_bytes} bytes.")
-        verification_char = measured_data[0]
-        if chr(verification_char) != '#':
-            raise ValueError(
-                f'Did not receive verification character #. Actual character is {verification_char}')
+        :param out: Preallocated uint8 array of at least 3*n_samples bytes to read the data into
+        :param progress: Function called as progress(n_read, n_samples) with the number of samples read so far, after every chunk
+        :param chunk_samples: Maximum number of samples per read
+        :returns byte_array, sync_array: Raw arrays of bytes of the samples and of the synchronization indices
+        """
+        self.write_line('MEASURE:SYNC?')
+        measured_bytes = self._read_samples(
+                out=out, progress=progress, chunk_samples=chunk_samples)
+        if len(measured_bytes) < self._n_samples * 3:
+            return measured_bytes, np.zeros(0, dtype=np.uint8) # The sync block was discarded with the rest of the reply
+        sync_bytes = self.read_binary_block(np.uint8)
+        return measured_bytes, sync_bytes
 
-        measured_bytes = np.frombuffer(
-                measured_data[1:], dtype=np.uint8)
+    def _read_samples(self, out=None, progress=None, chunk_samples=10000):
+        """
+        Reads the samples sent in reply to a measurement command. See measure()
+        """
+        n_samples = self._n_samples
+        chunk_samples = min(chunk_samples, n_samples)
+        measurement_time = n_samples / self.sampling_frequency
+        if progress is None:
+            byte_progress = None
+        else:
+            byte_progress = lambda n_read, n_bytes: progress(n_read // 3, n_samples)
 
-        if measurement_time_ms > old_timeout:
-            self.device.timeout = old_timeout
+        old_timeout = self.timeout
+        self.timeout = chunk_samples / self.sampling_frequency + self.TIMEOUT_MARGIN
+        try:
+            measured_bytes = self.read_binary_block(
+                    np.uint8, out=out, length_header=False,
+                    n_bytes=self._n_bytes - 1, chunk_bytes=chunk_samples*3,
+                    progress=byte_progress,
+                    timeout=measurement_time + self.TIMEOUT_MARGIN,
+                    allow_short=True)
+        finally:
+            self.timeout = old_timeout
 
-        return measured_bytes
+        n_received = len(measured_bytes) // 3
+        if n_received < n_samples:
+            warnings.warn(f'Received only {n_received} of {n_samples} samples before timing out. Returning the received samples.')
+            self.clear_input()
+        return measured_bytes[:n_received*3]
 
     def sync_points(self):
         """
@@ -96,58 +150,211 @@ class MCP3561(SCPIDevice, MotorController):
         """
         return int(self.query('SYNC:NUMPOINTS?'))
 
-    def sync_data(self):
+    def sync_data(self, out=None):
         """
         Get the measurement numbers that each synchronization pulse corresponds to.
 
+        :param out: Preallocated uint8 array to read the data into
         :returns data: an array of integers corresponding to the measurement indices of the synchronization point events.
 
         """
         number_points = self.sync_points()
         self.write_line('SYNC:DATA?')
-        number_bytes = number_points*3 +1
-        measuredData = self.read_bytes(number_bytes)
-        measuredData = np.frombuffer(measuredData[1:], dtype=np.uint8) # Discard the leading # and the newline at the end
+        measuredData = self.read_binary_block(
+                np.uint8, out=out, length_header=False,
+                n_bytes=number_points*3)
         return measuredData
 
-    def generate_data(self, sync=True, gain=None):
+    def _measure_with_sync(self, out=None, sync=True):
+        """
+        Measures data and, if sync is True, the synchronization points, in a single exchange if the firmware supports it
+
+        :returns byte_array, sync_array: Raw arrays of bytes of the samples and of the synchronization indices. sync_array is None if sync is False.
+        """
+        if not sync:
+            return self.measure(out=out), None
+        if self.combined_sync:
+            return self.measure_sync(out=out)
+        return self.measure(out=out), self.sync_data()
+
+    def generate_data(self, sync=True, gain=None, dtype=np.float64, as_dataframe=True):
         """
         Generates time-series voltage data with or without synchronization points
 
-        :param n_samples: The number of points of data to collect
         :param sync: Whether to report synchronization points from an external reference (True/False)
-        :returns: data - a pandas data frame with voltages, times, and (optional) sync points
-        """
-        voltages = twos_to_voltage(self.measure()) - self.offset_voltage
-        voltages = (voltages * ureg.V).to(ureg.mV)
-        times = np.linspace(0, self.n_samples / self.sampling_frequency,
-                          self.n_samples)
-        pi_phase_indices = twos_to_integer(self.sync_data())
-        pi_phase_indices = pi_phase_indices[pi_phase_indices<self.n_samples]
-        sync_column = np.zeros(self.n_samples, dtype=np.int)
-        sync_column[pi_phase_indices] = 1 # Sync event
-
-        if gain is None:
-            data = pd.DataFrame(data={
-                'Time (s)': times,
-                'Voltage (mV)': voltages.m
-                })
+        :param gain: Transimpedance or dimensionless gain applied to the voltages. See Capture.to_dataframe
+        :param dtype: Data type of the voltages (np.float64 or np.float32)
+        :param as_dataframe: Whether to return a pandas DataFrame. If False, returns a lightweight Capture record, avoiding the cost of building pint quantities and DataFrames.
+        :returns: data - a pandas data frame with voltages, times, and (optional) sync points, or a Capture
+        """
+        measured_bytes, sync_bytes = self._measure_with_sync(sync=sync)
+        data = self._decode_capture(measured_bytes, sync_bytes, dtype=dtype)
+        if as_dataframe:
+            data = data.to_dataframe(gain=gain)
+        return data
+
+    def _decode_capture(self, measured_bytes, sync_bytes, dtype=np.float64):
+        """
+        Decodes the raw bytes of a measurement into a Capture
+
+        :param measured_bytes: Raw bytes of the samples
+        :param sync_bytes: Raw bytes of the synchronization indices, or None if they were not measured
+        :param dtype: Data type of the voltages (np.float64 or np.float32)
+        """
+        voltages = twos_to_voltage(
+                measured_bytes, offsetVoltage=self.offset_voltage,
+                scale=1000, dtype=dtype)
+        n_samples = len(voltages) # Fewer than n_samples if the capture was cut short
+        if sync_bytes is not None:
+            pi_phase_indices = twos_to_integer(sync_bytes)
+            pi_phase_indices = pi_phase_indices[pi_phase_indices<n_samples]
         else:
-            if to_standard_quantity(gain).units == ureg.ohm:
-                new_data = to_standard_quantity(voltages / gain).to(ureg.nA)
-            elif to_standard_quantity(gain).dimensionless == True:
-                new_data = voltages.m
+            pi_phase_indices = None
+        return Capture(voltages, self.sampling_frequency,
+                       sync_indices=pi_phase_indices)
 
-            title = quantity_to_title(new_data)
-            data = pd.DataFrame(data={
-                'Time (s)': times,
-                title: new_data,
-                })
+    def stream(self, chunk_samples, total_samples=None, sync=True, dtype=np.float64):
+        """
+        Measures voltage data as a series of back-to-back captures of chunk_samples samples, yielding each chunk as soon as it has been read and decoded, so processing can start long before a large measurement completes. Only one chunk of raw data is held in memory at a time. Each chunk is a separate capture, so there is a gap in time between chunks which sample_offset does not count.
 
-        if sync == True:
-            data['Sync'] = sync_column
+        :param chunk_samples: Number of samples per chunk
+        :param total_samples: Total number of samples to measure. If None, measures until the generator is closed.
+        :param sync: Whether to read the synchronization points of each chunk
+        :param dtype: Data type of the voltages (np.float64 or np.float32)
+        :returns: Generator of (sample_offset, voltages, sync_indices, contiguous) tuples. sample_offset is the index of the first sample of the chunk, counting only measured samples, and voltages are in mV. sync_indices are sample indices counted from the same origin, or None if sync is False. contiguous is whether the chunk directly follows the previous one in time, which is False since every chunk is a separate capture. Pass it on to processors which carry samples over between chunks, such as PeriodicProcessor.update() and WelchPSD.update().
+        """
+        original_n_samples = self.n_samples
+        raw_buffer = np.empty(chunk_samples*3, dtype=np.uint8)
+        sample_offset = 0
+        try:
+            while total_samples is None or sample_offset < total_samples:
+                if total_samples is None:
+                    n_samples = chunk_samples
+                else:
+                    n_samples = min(chunk_samples, total_samples - sample_offset)
+                self.n_samples = n_samples
+                measured_bytes, sync_bytes = self._measure_with_sync(
+                        out=raw_buffer, sync=sync)
+                voltages = twos_to_voltage(
+                        measured_bytes,
+                        offsetVoltage=self.offset_voltage,
+                        scale=1000, dtype=dtype)
+                n_samples = len(voltages) # A chunk cut short is completed by the next capture
 
-        return data
+                if sync:
+                    sync_indices = twos_to_integer(sync_bytes).astype(np.int64)
+                    sync_indices = sync_indices[sync_indices < n_samples] + sample_offset
+                else:
+                    sync_indices = None
+
+                yield sample_offset, voltages, sync_indices, False
+                sample_offset += n_samples
+        finally:
+            self.n_samples = original_n_samples
+
+    def start_acquisition(
+            self, buffer_samples, chunk_samples=1000, sync=True, dtype=np.float64):
+        """
+        Starts continuously measuring in a background thread. Voltages (in mV) and sync indices are written into preallocated ring buffers, from which latest_samples() and next_samples() read without touching the serial port. Do not otherwise communicate with the device until stop_acquisition() is called.
+
+        Each capture of chunk_samples samples is a separate MEASURE? exchange, so the acquisition is not gap-free: there is a gap in time after every chunk_samples samples, which sample indices do not count.
+
+        :param buffer_samples: Number of most recent samples kept in memory
+        :param chunk_samples: Number of samples measured per capture
+        :param sync: Whether to record synchronization points
+        :param dtype: Data type of the voltages (np.float64 or np.float32)
+        """
+        if self._acquisition_thread is not None:
+            raise RuntimeError('Acquisition already running. Call stop_acquisition() first.')
+        self._voltage_buffer = RingBuffer(buffer_samples, dtype=dtype)
+        self._sync_buffer = RingBuffer(
+                max(buffer_samples // self.MIN_SYNC_PERIOD, 1), dtype=np.int64)
+        self._acquisition_error = None
+        self._stop_acquisition = threading.Event()
+        self._acquisition_thread = threading.Thread(
+                target=self._acquire, args=(chunk_samples, sync, dtype),
+                daemon=True)
+        self._acquisition_thread.start()
+
+    def _acquire(self, chunk_samples, sync, dtype):
+        """
+        Body of the acquisition thread
+        """
+        chunks = self.stream(chunk_samples, sync=sync, dtype=dtype)
+        try:
+            for sample_offset, voltages, sync_indices, contiguous in chunks:
+                if sync:
+                    self._sync_buffer.write(sync_indices)
+                self._voltage_buffer.write(voltages)
+                if self._stop_acquisition.is_set():
+                    break
+        except Exception as e:
+            self._acquisition_error = e
+        finally:
+            chunks.close()
+            self._voltage_buffer.close()
+
+    def stop_acquisition(self):
+        """
+        Stops the background acquisition after the current capture, and re-raises any error that stopped it early.
+        """
+        if self._acquisition_thread is None:
+            return
+        self._stop_acquisition.set()
+        self._acquisition_thread.join()
+        self._acquisition_thread = None
+        if self._acquisition_error is not None:
+            raise self._acquisition_error
+
+    @property
+    def acquired_samples(self):
+        """
+        Total number of samples measured since the acquisition started
+        """
+        return self._voltage_buffer.n_written
+
+    def latest_samples(self, n_samples):
+        """
+        Gets the most recent samples of the background acquisition
+
+        :param n_samples: Maximum number of samples to get
+        :returns: (sample_offset, voltages, sync_indices) tuple. sample_offset is the index of the first sample since the acquisition started, and voltages are in mV. sync_indices are the synchronization points among these samples. The samples may span several captures, with a gap in time at every multiple of chunk_samples, see start_acquisition().
+        """
+        sample_offset, voltages = self._voltage_buffer.latest(n_samples)
+        return sample_offset, voltages, self._sync_between(
+                sample_offset, sample_offset + len(voltages))
+
+    def next_samples(self, n_samples, timeout=None):
+        """
+        Waits for the background acquisition to measure n_samples new samples and gets them
+
+        :param n_samples: Number of new samples to wait for
+        :param timeout: Maximum time (s) to wait. Waits indefinitely if None.
+        :returns: (sample_offset, voltages, sync_indices) tuple, as for latest_samples()
+        """
+        sample_offset = self._voltage_buffer.n_written
+        is_written = self._voltage_buffer.wait_for(
+                sample_offset + n_samples,
+                timeout=timeout)
+        if not is_written:
+            if self._acquisition_error is not None:
+                raise self._acquisition_error
+            raise TimeoutError(f'{n_samples} samples not acquired within {timeout} s, or acquisition stopped.')
+        voltages = self._voltage_buffer.read(sample_offset, n_samples)
+        return sample_offset, voltages, self._sync_between(
+                sample_offset, sample_offset + n_samples)
+
+    def _sync_between(self, start_index, stop_index):
+        """
+        Sync indices of the background acquisition between two sample indices. The sync buffer is sorted, so only the indices in the range are copied.
+        """
+        while True:
+            first_index = self._sync_buffer.searchsorted(start_index)
+            last_index = self._sync_buffer.searchsorted(stop_index)
+            try:
+                return self._sync_buffer.read(first_index, last_index - first_index)
+            except ValueError:
+                continue # The acquisition overwrote the indices while we read them
 
     @property
     @ureg.wraps(ureg.nm, None, strict=False)
@@ -164,3 +371,30 @@ class MCP3561(SCPIDevice, MotorController):
         self.rotate_motor(number_microsteps)
         self._wavelength += delta_wavelength
 
+
+    def sweep_wavelengths(self, wavelengths, process=None, sync=True, dtype=np.float64):
+        """
+        Measures at each of a series of wavelengths. Decoding and processing of each point run in a worker thread, overlapped with the motor move to the next wavelength and its acquisition, so the device is never left idle while a point is processed.
+
+        :param wavelengths: Iterable of wavelengths in nm, or pint quantities
+        :param process: Function called as process(capture) in the worker thread with the Capture of each point, such as a lock-in. Its return value is the result for that point. If None, the Capture itself is the result.
+        :param sync: Whether to measure the synchronization points of each point
+        :param dtype: Data type of the voltages (np.float64 or np.float32)
+        :returns results: List of results, one per wavelength
+        """
+        def decode_and_process(measured_bytes, sync_bytes):
+            capture = self._decode_capture(measured_bytes, sync_bytes, dtype=dtype)
+            if process is None:
+                return capture
+            return process(capture)
+
+        futures = []
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            for wavelength in wavelengths:
+                if futures and futures[-1].done():
+                    futures[-1].result() # Stop early if processing failed
+                self.wavelength = wavelength
+                measured_bytes, sync_bytes = self._measure_with_sync(sync=sync)
+                futures.append(executor.submit(
+                        decode_and_process, measured_bytes, sync_bytes))
+            return [future.result() for future in futures]
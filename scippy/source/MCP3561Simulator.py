@@ -0,0 +1,156 @@
+"""
+Stand-in for the serial port of the MCP3561 dev board, for developing and testing without hardware.
+"""
+import time
+import numpy as np
+
+class MCP3561Simulator:
+    def __init__(self, device_name='MCP3561 Dev Board v1',
+            sampling_frequency=9765.65, sync_frequency=105,
+            amplitude_counts=100000, read_termination='\r\n',
+            write_termination='\n'):
+        """
+        Serial-port-like object which answers commands the way the dev board firmware does. Pass it as the device of an MCP3561 to use the driver without hardware. The simulated signal is a square wave which rises at every pulse of a simulated synchronization reference.
+
+        :param device_name: Name returned by the identify command
+        :param sampling_frequency: Sampling frequency (Hz) of the simulated ADC
+        :param sync_frequency: Frequency (Hz) of the synchronization reference and the square wave
+        :param amplitude_counts: Amplitude of the square wave in ADC counts
+        :param read_termination: Termination of the lines the simulator sends
+        :param write_termination: Termination of the lines the simulator receives
+        """
+        self.device_name = device_name
+        self.sampling_frequency = sampling_frequency
+        self.sync_frequency = sync_frequency
+        self.amplitude_counts = amplitude_counts
+        self.read_termination = read_termination
+        self.write_termination = write_termination
+        self.timeout = 1
+        self.is_open = True
+        self.commands = [] # Every command received, in order
+        self.reset()
+        self._input = b''
+        self._output = bytearray()
+
+    def reset(self):
+        """
+        Returns the simulated board to its power-on state
+        """
+        self.n_samples = 1
+        self.motor_enabled = False
+        self.motor_position = 0
+        self.motor_direction = 0
+        self.motor_period = 2 # ms per step
+        self._motor_stop_time = 0
+        self._sample_clock = 0 # Samples since power-on, which sets the phase of the reference
+        self._sync_indices = np.array([], dtype=np.int64)
+
+    def write(self, data):
+        self._input += bytes(data)
+        terminator = self.write_termination.encode()
+        while terminator in self._input:
+            line, self._input = self._input.split(terminator, 1)
+            self._handle_command(line.decode().strip())
+        return len(data)
+
+    def readline(self):
+        terminator = self.read_termination.encode()[-1:]
+        end_index = self._output.find(terminator)
+        if end_index < 0:
+            end_index = len(self._output) - 1
+        return self.read(end_index + 1)
+
+    def read(self, size=1):
+        data = bytes(self._output[:size])
+        del self._output[:size]
+        return data
+
+    def readinto(self, buffer):
+        n_bytes = min(len(buffer), len(self._output))
+        buffer[:n_bytes] = self._output[:n_bytes]
+        del self._output[:n_bytes]
+        return n_bytes
+
+    def reset_input_buffer(self):
+        self._output.clear()
+
+    def close(self):
+        self.is_open = False
+
+    def _reply(self, line):
+        self._output += (str(line) + self.read_termination).encode()
+
+    def _handle_command(self, command):
+        self.commands.append(command)
+        name, _, argument = command.partition(' ')
+        if name == '*IDN?':
+            self._reply(self.device_name)
+        elif name == '*RST':
+            self.reset()
+        elif name == 'CONFIGURE':
+            self.n_samples = int(argument)
+        elif name == 'MEASURE?':
+            self._output += b'#' + self._capture()
+        elif name == 'MEASURE:SYNC?':
+            samples = self._capture()
+            self._output += b'#' + samples + self._sync_block()
+        elif name == 'SYNC:NUMPOINTS?':
+            self._reply(len(self._sync_indices))
+        elif name == 'SYNC:DATA?':
+            self._output += b'#' + encode_integers(self._sync_indices)
+        elif name == 'MOTOR:ENABLE':
+            self.motor_enabled = True
+        elif name == 'MOTOR:DISABLE':
+            self.motor_enabled = False
+        elif name == 'MOTOR:ENABLED?':
+            self._reply(int(self.motor_enabled))
+        elif name == 'MOTOR:ROTATE':
+            self.motor_position += int(argument)
+            self._motor_stop_time = time.monotonic() + \
+                abs(int(argument)) * self.motor_period * 1e-3
+        elif name == 'MOTOR:ROTATE?':
+            self._reply(int(time.monotonic() < self._motor_stop_time))
+        elif name == 'MOTOR:POSITION':
+            self.motor_position = int(argument)
+        elif name == 'MOTOR:POSITION?':
+            self._reply(self.motor_position)
+        elif name == 'MOTOR:DIRECTION':
+            self.motor_direction = int(argument)
+        elif name == 'MOTOR:DIRECTION?':
+            self._reply(self.motor_direction)
+        elif name == 'MOTOR:PERIOD':
+            self.motor_period = int(argument)
+        elif name == 'MOTOR:PERIOD?':
+            self._reply(self.motor_period)
+
+    def _capture(self):
+        """
+        Simulates a capture of n_samples samples, recording the samples at which the reference rose
+
+        :returns data: Samples as 3-byte twos-complement integers, most significant byte first
+        """
+        clock = self._sample_clock - 1 + np.arange(self.n_samples + 1) # Includes the sample before the capture
+        periods = np.floor(clock * self.sync_frequency / self.sampling_frequency)
+        phase = clock * self.sync_frequency / self.sampling_frequency - periods
+        self._sync_indices = np.flatnonzero(np.diff(periods))
+        self._sample_clock += self.n_samples
+        counts = np.where(phase[1:] < 0.5, 1, -1) * self.amplitude_counts
+        return encode_integers(counts)
+
+    def _sync_block(self):
+        """
+        Synchronization indices of the last capture as an IEEE 488.2 definite-length binary block
+        """
+        payload = encode_integers(self._sync_indices)
+        length = str(len(payload))
+        return f'#{len(length)}{length}'.encode() + payload
+
+def encode_integers(integers):
+    """
+    Encodes integers as 3-byte twos-complement integers, most significant byte first, the way the MCP3561 firmware sends them.
+
+    :param integers: Array of integers
+    :returns data: bytes object
+    """
+    words = (np.asarray(integers, dtype=np.int64) & 0xFFFFFF).astype('>u4')
+    return words.view(np.uint8).reshape(-1, 4)[:, 1:].tobytes()
@@ -0,0 +1,130 @@
+import threading
+import numpy as np
+
+class RingBuffer:
+    def __init__(self, capacity, dtype=np.float64):
+        """
+        Fixed-size, preallocated numpy ring buffer with a single writer and any number of readers. Readers never block the writer: they copy data out without a lock, and retry if the writer overwrote it while they were copying.
+
+        Samples are addressed by their absolute index, counted from the first sample ever written.
+
+        :param capacity: Number of samples the buffer holds
+        :param dtype: Data type of the samples
+        """
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=dtype)
+        self._n_written = 0
+        self._n_reserved = 0 # Samples written, plus those being written
+        self._closed = False
+        self._condition = threading.Condition()
+
+    @property
+    def n_written(self):
+        """
+        Total number of samples ever written. The index of the next sample to be written.
+        """
+        return self._n_written
+
+    @property
+    def first_available(self):
+        """
+        Absolute index of the oldest sample still in the buffer
+        """
+        return max(self._n_written - self.capacity, 0)
+
+    def write(self, samples):
+        """
+        Appends samples to the buffer, overwriting the oldest samples once it is full. Must only be called from one thread.
+
+        :param samples: Array of samples
+        """
+        samples = np.asarray(samples)
+        n_samples = len(samples)
+        if n_samples > self.capacity:
+            samples = samples[-self.capacity:]
+        self._n_reserved = self._n_written + n_samples # Readers treat the region being written as overwritten
+        start_index = (self._n_written + n_samples - len(samples)) % self.capacity
+        n_first = min(len(samples), self.capacity - start_index)
+        self._data[start_index:start_index + n_first] = samples[:n_first]
+        self._data[:len(samples) - n_first] = samples[n_first:]
+
+        with self._condition:
+            self._n_written += n_samples # Publish the samples only once they are in place
+            self._condition.notify_all()
+
+    def read(self, start_index, n_samples):
+        """
+        Copies samples out of the buffer
+
+        :param start_index: Absolute index of the first sample
+        :param n_samples: Number of samples to read
+        :returns samples: Array of samples
+        """
+        if start_index + n_samples > self._n_written:
+            raise ValueError(f'Samples {start_index} to {start_index + n_samples} have not been written yet. Only {self._n_written} samples written.')
+        samples = np.empty(n_samples, dtype=self._data.dtype)
+        buffer_index = start_index % self.capacity
+        n_first = min(n_samples, self.capacity - buffer_index)
+        samples[:n_first] = self._data[buffer_index:buffer_index + n_first]
+        samples[n_first:] = self._data[:n_samples - n_first]
+
+        if start_index < self._n_reserved - self.capacity: # Overwritten before or during the copy
+            raise ValueError(f'Samples starting at {start_index} have been overwritten. Oldest available sample is {self.first_available}.')
+        return samples
+
+    def latest(self, n_samples):
+        """
+        Copies the most recently written samples out of the buffer
+
+        :param n_samples: Maximum number of samples to read
+        :returns start_index, samples: Absolute index of the first sample, and the samples
+        """
+        while True:
+            n_written = self._n_written
+            n_pending = self._n_reserved - n_written
+            n_available = min(n_samples, n_written, self.capacity - n_pending)
+            try:
+                return n_written - n_available, self.read(n_written - n_available, n_available)
+            except ValueError:
+                continue # The writer lapped us. Try again with the newest samples.
+
+    def searchsorted(self, value):
+        """
+        Finds where a value would be inserted among the samples still in the buffer, which must be in increasing order. Searches the buffer in place, without copying the samples.
+
+        :param value: Value to search for
+        :returns index: Absolute index of the first sample not less than value, or n_written if there is none
+        """
+        while True:
+            n_written = self._n_written
+            first_available = max(n_written - self.capacity, 0)
+            buffer_index = first_available % self.capacity
+            n_first = min(n_written - first_available, self.capacity - buffer_index)
+            index = np.searchsorted(self._data[buffer_index:buffer_index + n_first], value)
+            if index == n_first:
+                index += np.searchsorted(
+                        self._data[:n_written - first_available - n_first], value)
+            if first_available >= self._n_reserved - self.capacity: # Not overwritten during the search
+                return first_available + index
+
+    def wait_for(self, n_written, timeout=None):
+        """
+        Waits until a total of n_written samples have been written
+
+        :param n_written: Total number of samples to wait for
+        :param timeout: Maximum time (s) to wait. Waits indefinitely if None.
+        :returns is_written: Whether the samples were written before the timeout, or before the buffer was closed
+        """
+        with self._condition:
+            self._condition.wait_for(
+                    lambda: self._n_written >= n_written or self._closed,
+                    timeout=timeout)
+            return self._n_written >= n_written
+
+    def close(self):
+        """
+        Marks the buffer as finished, so that readers stop waiting for new samples
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
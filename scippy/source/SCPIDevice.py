@@ -4,12 +4,172 @@ from serial.tools.list_ports import comports
 import numpy as np
 import time
 import re
+import threading
+import copy
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from scippy.source.discovery_cache import cached_resource, update_discovery_cache, invalidate_discovery_cache
+from scippy.source.session_pool import get_resource_manager, acquire_session, register_session, release_session, pooled_resources, ResourceBusyError
+
+def probe_resources(
+        resource_names, probe, device_name='', find_all=False, timeout=10):
+    """
+    Probes a set of candidate resources concurrently, each in its own thread, and collects the ones whose identity matches the desired device name. Probes which are still running when the search finishes are cancelled, and any device they open is closed.
+
+    :param resource_names: Names of the resources to probe
+    :param probe: Function which opens and identifies a single resource. Returns a (device, actual_name) tuple, or None if the resource did not respond.
+    :param device_name: Desired device name. If empty, any responding resource matches.
+    :param find_all: Whether to wait for every match (True) or return the first match (False)
+    :param timeout: Maximum time (s) to wait for the probes
+    :returns matches: List of (resource_name, device, actual_name) tuples in the order they responded
+    """
+    resource_names = list(resource_names)
+    lock = threading.Lock()
+    finished = threading.Event()
+    state = {'cancelled': False, 'remaining': len(resource_names)}
+    matches = []
+    errors = []
+
+    def run_probe(rname):
+        try:
+            result = None if state['cancelled'] else probe(rname)
+        except Exception as e:
+            result = None
+            with lock:
+                errors.append(e)
+        with lock:
+            state['remaining'] -= 1
+            if result is not None:
+                device, actual_name = result
+                is_match = device_name == '' or device_name == actual_name
+                if state['cancelled'] or not is_match:
+                    device.close()
+                else:
+                    matches.append((rname, device, actual_name))
+                    if not find_all:
+                        state['cancelled'] = True
+            if state['cancelled'] or state['remaining'] == 0:
+                finished.set()
+
+    if len(resource_names) == 0:
+        return matches
+
+    executor = ThreadPoolExecutor(max_workers=len(resource_names))
+    for rname in resource_names:
+        executor.submit(run_probe, rname)
+    finished.wait(timeout)
+    with lock:
+        state['cancelled'] = True
+    executor.shutdown(wait=False)
+
+    if len(matches) == 0 and len(errors) > 0:
+        raise errors[0]
+    return matches
+
+def _probe_visa_resource(
+        rm, rname, read_termination='\n', write_termination='\n',
+        baud_rate=9600, probe_timeout=2, n_retries=2):
+    """
+    Opens a single VISA resource and queries its identity, retrying on communication timeouts.
+
+    :param rm: pyvisa ResourceManager
+    :param rname: Name of the resource to open
+    :param probe_timeout: Communication timeout (s) for each identify attempt
+    :param n_retries: Number of additional attempts after a communication timeout
+    :returns result: (device, actual_name) tuple, or None if the resource did not respond
+    """
+    print(f'Attempting connection to {rname}...')
+    for attempt in range(n_retries + 1):
+        try:
+            if re.search(r'ASRL\d+::', rname) is not None:
+                device = rm.open_resource(
+                        rname, baud_rate=baud_rate,
+                        read_termination=read_termination,
+                        write_termination=write_termination)
+            elif re.search(r'USB\d+::', rname) is not None:
+                device = rm.open_resource(
+                        rname,
+                        read_termination=read_termination,
+                        write_termination=write_termination)
+            elif re.search(r'GPIB\d+::', rname) is not None:
+                device = rm.open_resource(rname)
+            else:
+                print(f'Device type for rname {rname} not recognized.')
+                return None
+        except pyvisa.errors.VisaIOError as e:
+            if e.abbreviation == 'VI_ERROR_RSRC_BUSY':
+                raise Exception('It appears VISA is having a heart attack. Try unplugging and plugging back in your device / USB hub, or closing out any other running python terminals or programs which might be trying to access this resource.')
+            print(f'VISA resource {rname} not found. Trying next device...')
+            return None
+
+        old_timeout = device.timeout
+        device.timeout = 1000 * probe_timeout
+        try:
+            device.write('*IDN?')
+            actual_name = device.read()
+        except UserWarning:
+            device.close()
+            return None
+        except pyvisa.errors.VisaIOError:
+            device.close()
+            if attempt < n_retries:
+                print(f'Communication timeout error. Attempting to reconnect to device {rname}')
+                time.sleep(1)
+            continue
+        device.timeout = old_timeout
+        return device, actual_name
+    return None
+
+def _probe_serial_port(
+        port_name, read_termination='\n', write_termination='\n',
+        baud_rate=9600):
+    """
+    Opens a single serial port and queries the identity of the device attached to it.
+
+    :param port_name: Name of the serial port to open
+    :returns result: (device, actual_name) tuple, or None if the port did not respond
+    """
+    try:
+        device = serial.Serial(port_name)
+    except serial.SerialException:
+        return None
+    device.timeout = 0.05
+    device.baudrate = baud_rate
+    try:
+        device.write(bytes('*IDN?' + write_termination, encoding='ascii'))
+        actual_name = device.readline().decode().rstrip(read_termination)
+    except (serial.SerialException, UnicodeDecodeError):
+        device.close()
+        return None
+    return device, actual_name
+
+def parse_bool(reply):
+    """
+    Converts a boolean reply from a device (1/0, ON/OFF, true/false) to a bool
+
+    :param reply: Reply string
+    :returns value: The boolean value of the reply
+    """
+    reply = reply.strip().lower()
+    if reply in ['on', 'true']:
+        return True
+    elif reply in ['off', 'false']:
+        return False
+    else:
+        return bool(int(float(reply)))
 
 class SCPIDevice:
+    SUPPORTS_COMPOUND_COMMANDS = True
+    MAX_MESSAGE_LENGTH = 256
+    RESPONSE_SEPARATOR = ';'
+    STATE_QUERIES = {}
+    CACHED_PROBE_TIMEOUT = 0.5 # s. Timeout of the single identify attempt at the cached resource
+
     def __init__(self, lib_type='pyvisa', device_name='',
             resource_name='',
             read_termination='\n', write_termination='\n',
-            baud_rate=9600):
+            baud_rate=9600, use_cache=True, use_pool=True,
+            cache_state=False, device=None):
         """
         Base class for devices which use SCPI for communication. Works with either pyvisa or pyserial.
 
@@ -17,129 +177,226 @@ class SCPIDevice:
         :param device_name: Device name as it responds to the identify command
         :param read_termination: Read termination character
         :param write_termination: Write termination character
+        :param use_cache: Whether to first try the resource at which this device was last found before searching all resources
+        :param use_pool: Whether to share VISA sessions through the process-wide session pool. Pooled sessions stay open when the device is closed, so that reopening the device is nearly free, and are closed by session_pool.close_sessions() or when the interpreter exits. A session is used by one device at a time, so opening a second device for an instrument which is already open raises ResourceBusyError. Pass use_pool=False to open and close a separate session, as without the pool.
+        :param cache_state: Whether to mirror the device settings locally. Getters then return the last value set without querying the device, and setters which would not change the value are skipped. Use refresh() or invalidate() if the device may have been changed by anything else.
+        :param device: Already open pyvisa resource or serial-port-like object (such as a simulator) to use instead of searching for the device
         """
         self.lib_type = lib_type
+        self.use_pool = use_pool
+        self.cache_state = cache_state
+        self._state = {}
+        self._batch_queue = None
+        if device is not None:
+            self.resource_name = resource_name
+            self.device = device
+            self.read_termination = read_termination
+            self.write_termination = write_termination
+            return
+
+        if use_cache and device_name != '' and resource_name == '':
+            cached_name = cached_resource(lib_type, device_name)
+            if cached_name is not None:
+                try:
+                    self._find_device(
+                            device_name=device_name,
+                            candidates=[cached_name],
+                            read_termination=read_termination,
+                            write_termination=write_termination,
+                            baud_rate=baud_rate,
+                            probe_timeout=self.CACHED_PROBE_TIMEOUT,
+                            n_retries=0)
+                    return
+                except ResourceBusyError:
+                    raise # The entry is valid, but another device has the session
+                except (RuntimeError, ValueError):
+                    invalidate_discovery_cache(lib_type, device_name) # No reply, or a different device replied
+
+        self._find_device(
+                device_name=device_name, resource_name=resource_name,
+                read_termination=read_termination,
+                write_termination=write_termination,
+                baud_rate=baud_rate)
+        if use_cache and device_name != '':
+            update_discovery_cache(lib_type, device_name, self.resource_name)
+
+    def _find_device(
+            self, device_name='', resource_name='', candidates=[],
+            read_termination='\n', write_termination='\n', baud_rate=9600,
+            probe_timeout=2, n_retries=2):
+        """
+        Finds and opens the device using the appropriate library
+
+        :param candidates: Resources (or serial ports) to probe. If empty, all available resources are probed.
+        :param probe_timeout: Communication timeout (s) for a single VISA identify attempt
+        :param n_retries: Number of additional VISA identify attempts after a communication timeout
+        """
         if self.lib_type == 'pyvisa':
             self.get_visa_device(device_name=device_name,
                     resource_name=resource_name,
+                    resource_list=candidates,
                     read_termination=read_termination,
                     write_termination=write_termination,
-                    baud_rate=baud_rate)
+                    baud_rate=baud_rate, probe_timeout=probe_timeout,
+                    n_retries=n_retries)
         else:
             self.get_serial_device(device_name=device_name,
+                    port_list=candidates,
                     read_termination=read_termination,
                     write_termination=write_termination,
                     baud_rate=baud_rate)
 
     def get_serial_device(
             self, device_name='', read_termination='\n',
-            write_termination='\n', baud_rate=9600):
+            write_termination='\n', baud_rate=9600, port_list=[],
+            discovery_timeout=5):
         r"""
-        Searches for and initializes USB device with pyserial with the desired name
+        Searches for and initializes USB device with pyserial with the desired name. All candidate ports are probed concurrently.
 
         :param device_name: Name of the device as it responds to the identify command (\*IDN?)
         :param read_termination: The read termination character
         :param write_termination: The write termination character
+        :param port_list: Ports to probe. If empty, all USB serial ports are probed.
+        :param discovery_timeout: Maximum time (s) to wait for a matching device
         """
-        port_names = [port.device for port in comports()]
-        is_usb_modem = ['usbmodem' in x for x in port_names]
-        is_usb_serial = ['usbserial' in x for x in port_names]
-        usb_modem_indices = np.where(is_usb_modem)[0]
-        usb_serial_indices = np.where(is_usb_serial)[0]
-        usb_indices = np.append(usb_modem_indices, usb_serial_indices)
+        if port_list == []:
+            port_names = [port.device for port in comports()]
+            is_usb_modem = ['usbmodem' in x for x in port_names]
+            is_usb_serial = ['usbserial' in x for x in port_names]
+            usb_modem_indices = np.where(is_usb_modem)[0]
+            usb_serial_indices = np.where(is_usb_serial)[0]
+            usb_indices = np.append(usb_modem_indices, usb_serial_indices)
+            port_list = [port_names[index] for index in usb_indices]
 
-        if len(usb_indices) == 0:
-            raise ValueError(f'No Serial device found. Make sure it is plugged in. Available devices are {port_names}')
+            if len(port_list) == 0:
+                raise ValueError(f'No Serial device found. Make sure it is plugged in. Available devices are {port_names}')
 
-        for index in usb_indices:
-            self.read_termination = read_termination
-            self.write_termination = write_termination
-            self.device = serial.Serial(port_names[index])
-            self.device.timeout = 0.05
-            self.device.baudrate = baud_rate
-            actual_name = self.identify()
-            if device_name == '':
-                break
-            elif device_name == actual_name:
-                break
+        def probe(port_name):
+            return _probe_serial_port(
+                    port_name, read_termination=read_termination,
+                    write_termination=write_termination,
+                    baud_rate=baud_rate)
+
+        matches = probe_resources(
+                port_list, probe, device_name=device_name,
+                timeout=discovery_timeout)
+        if len(matches) == 0:
+            raise ValueError(f'Serial device {device_name} not found. Probed ports {port_list}')
+
+        self.resource_name, self.device, _ = matches[0]
+        self.read_termination = read_termination
+        self.write_termination = write_termination
 
     def get_visa_device(
             self, device_name='', resource_name='', resource_list=[],
             read_termination='\n',
-            write_termination='\n', baud_rate=9600, timeout_counter=0):
+            write_termination='\n', baud_rate=9600,
+            probe_timeout=2, n_retries=2, discovery_timeout=10):
         """
-        Initializes our device using the Visa resource manager
+        Initializes our device using the Visa resource manager. All candidate resources are probed concurrently.
 
         :param device_name: Desired device name as it responds to the SCPI identify command
+        :param resource_name: Resource to use. If specified, no other resources are probed.
+        :param resource_list: Resources to probe. If empty, all available resources are probed.
         :param read_termination: Read termination character(s)
         :param write_termination: Write termination character(s)
+        :param probe_timeout: Communication timeout (s) for a single identify attempt
+        :param n_retries: Number of additional identify attempts after a communication timeout
+        :param discovery_timeout: Maximum time (s) to wait for a matching device
         """
-        rm = pyvisa.ResourceManager()
+        self._read_termination = read_termination
+        self._write_termination = write_termination
+        if self.use_pool:
+            # Raises ResourceBusyError if another device is using the session
+            session = acquire_session(
+                    resource_name=resource_name, device_name=device_name)
+            if session is not None:
+                self._set_visa_device(*session)
+                self.read_termination = read_termination # The previous owner may have changed them
+                self.write_termination = write_termination
+                return
+
+        rm = get_resource_manager()
+        if resource_name != '':
+            resource_list = [resource_name]
         if resource_list == []:
             resource_list = rm.list_resources()
-        self.is_gpib = False
-        self.is_generic = False
         if len(resource_list) == 0:
             raise RuntimeError("No resources found")
-        if resource_name != '':
-            resource_list = [resource_name]
-        for i, rname in enumerate(resource_list):
-            try:
-                print(f'Attempting connection to {rname}...')
-                if re.search(r'ASRL\d+::', rname) is not None:
-                    self.is_generic = True
-                if re.search(r'USB\d+::', rname) is not None:
-                    self.is_usb = True
-                if re.search(r'GPIB\d+::', rname) is not None:
-                    self.is_gpib = True
-
-                if self.is_generic:
-                    self.device = rm.open_resource(
-                            rname, baud_rate=baud_rate,
-                            read_termination=read_termination,
-                            write_termination=write_termination)
-                elif self.is_usb:
-                    self.device = rm.open_resource(
-                            rname,
-                            read_termination=read_termination,
-                            write_termination=write_termination)
-                elif self.is_gpib:
-                    self.device = rm.open_resource(rname)
-                else:
-                    raise ValueError(f'Device type for rname {rname} not recognized.')
+        if self.use_pool:
+            open_resources = pooled_resources() # Sessions of this device were found by acquire_session(), so the rest belong to other devices
+            resource_list = [rname for rname in resource_list if rname not in open_resources]
 
-                self._read_termination = read_termination
-                self._write_termination = write_termination
-                device_name_actual = self.identify()
-                if device_name == '':
-                    break # Use the first available resource
-                else:
-                    if device_name == device_name_actual:
-                        print(f'Correct device found.')
-                        return
-            except UserWarning:
-                pass
-            except pyvisa.errors.VisaIOError as e:
-                if e.abbreviation == 'VI_ERROR_RSRC_NFOUND':
-                    print(f'VISA resource not found. Trying next device...')
-                elif e.abbreviation == 'VI_ERROR_RSRC_BUSY':
-                    raise Exception('It appears VISA is having a heart attack. Try unplugging and plugging back in your device / USB hub, or closing out any other running python terminals or programs which might be trying to access this resource.')
-                else: # This is currently not working.
-                    print(f'Communication timeout error. Attempting to reconnect to device {rname}')
-                    time.sleep(1)
-                    if timeout_counter < 2:
-                        new_timeout = timeout_counter + 1
-                        new_list = resource_list[i:]
-                    elif timeout_counter >= 2:
-                        new_timeout = 0
-                        new_list = resource_list[i+1:]
-                    self.get_visa_device(
-                            device_name=device_name,
-                            read_termination=read_termination,
-                            write_termination=write_termination,
-                            baud_rate=baud_rate,
-                            resource_list=new_list,
-                            timeout_counter=new_timeout)
+        def probe(rname):
+            return _probe_visa_resource(
+                    rm, rname, read_termination=read_termination,
+                    write_termination=write_termination,
+                    baud_rate=baud_rate, probe_timeout=probe_timeout,
+                    n_retries=n_retries)
+
+        matches = probe_resources(
+                resource_list, probe, device_name=device_name,
+                timeout=discovery_timeout)
+        if len(matches) == 0:
+            raise RuntimeError(f'Device {device_name} not found. Probed resources {list(resource_list)}')
+
+        rname, device, actual_name = matches[0]
+        print(f'Correct device found at {rname}.')
+        if self.use_pool:
+            register_session(rname, device, actual_name)
+        self._set_visa_device(rname, device)
+
+    def _set_visa_device(self, rname, device):
+        """
+        Uses an open VISA resource as this object's device
+
+        :param rname: VISA resource name
+        :param device: Open pyvisa resource
+        """
+        self.resource_name = rname
+        self.device = device
+        self.is_generic = re.search(r'ASRL\d+::', rname) is not None
+        self.is_usb = re.search(r'USB\d+::', rname) is not None
+        self.is_gpib = re.search(r'GPIB\d+::', rname) is not None
+
+    @staticmethod
+    def discover_devices(
+            lib_type='pyvisa', device_name='',
+            read_termination='\n', write_termination='\n',
+            baud_rate=9600, timeout=10):
+        """
+        Probes all available resources concurrently and reports every device which responds to the identify command. All probed devices are closed afterwards. VISA resources already open in the session pool are not probed.
+
+        :param lib_type: "pyvisa" or "pyserial".
+        :param device_name: Only report devices with this name. If empty, all responding devices are reported.
+        :param timeout: Maximum time (s) to wait for all devices to respond
+        :returns devices: Dictionary of resource name: device name pairs
+        """
+        if lib_type == 'pyvisa':
+            rm = get_resource_manager()
+            open_resources = pooled_resources()
+            resource_list = [rname for rname in rm.list_resources() if rname not in open_resources]
+            def probe(rname):
+                return _probe_visa_resource(
+                        rm, rname, read_termination=read_termination,
+                        write_termination=write_termination,
+                        baud_rate=baud_rate)
+        else:
+            resource_list = [port.device for port in comports()]
+            def probe(port_name):
+                return _probe_serial_port(
+                        port_name, read_termination=read_termination,
+                        write_termination=write_termination,
+                        baud_rate=baud_rate)
+
+        matches = probe_resources(
+                resource_list, probe, device_name=device_name,
+                find_all=True, timeout=timeout)
+        devices = {}
+        for rname, device, actual_name in matches:
+            device.close()
+            devices[rname] = actual_name
+        return devices
 
     @property
     def read_termination(self):
@@ -168,6 +425,25 @@ class SCPIDevice:
             self.device.write_termination = write_termination
 
 
+    @property
+    def timeout(self):
+        """
+        Timeout (s) of a single read from the device, or None to wait indefinitely. pyvisa resources count in ms and serial ports in s, so use this rather than device.timeout directly.
+        """
+        if self.lib_type == 'pyvisa':
+            timeout = self.device.timeout
+            if timeout is None or timeout == float('inf'): # pyvisa reports an infinite timeout as either
+                return None
+            return timeout / 1000
+        return self.device.timeout
+
+    @timeout.setter
+    def timeout(self, timeout):
+        if self.lib_type == 'pyvisa' and timeout is not None:
+            self.device.timeout = timeout * 1000
+        else:
+            self.device.timeout = timeout # None is infinite for both pyvisa and pyserial
+
     def query(self, string):
         """
         Queries the device by first writing a desired string to it and then waiting for the reply.
@@ -178,12 +454,63 @@ class SCPIDevice:
         self.write_line(string)
         return self.read_line()
 
+    def query_many(self, commands, parsers=None):
+        """
+        Queries the device with several queries at once. Devices which support compound commands receive them as a single compound query, or as few as MAX_MESSAGE_LENGTH allows, with the reply to each read before the next is sent.
+
+        :param commands: List of queries, or dictionary of {name: query}
+        :param parsers: Function (e.g. float, int, bool) applied to every reply, or a list / dictionary of functions matching the queries. None leaves the reply as a string.
+        :returns replies: Tuple of parsed replies, or dictionary of {name: reply} if commands is a dictionary
+        """
+        if isinstance(commands, dict):
+            names = list(commands.keys())
+            queries = list(commands.values())
+        else:
+            names = None
+            queries = list(commands)
+        if len(queries) == 0:
+            raise ValueError('No queries given.')
+
+        if parsers is None or callable(parsers):
+            parsers = [parsers] * len(queries)
+        elif isinstance(parsers, dict):
+            if names is None:
+                raise ValueError('Parsers can only be given as a dictionary if the queries are a dictionary.')
+            parsers = [parsers.get(name) for name in names]
+        if len(parsers) != len(queries):
+            raise ValueError(f'Got {len(parsers)} parsers for {len(queries)} queries.')
+
+        replies = []
+        for message, n_queries in self._join_groups(queries):
+            self.write_line(message)
+            # Read before writing the next message, since IEEE 488.2 instruments discard an unread reply when sent a new message
+            if self.SUPPORTS_COMPOUND_COMMANDS and self.RESPONSE_SEPARATOR is not None:
+                replies += self.read_line().split(self.RESPONSE_SEPARATOR)
+            else:
+                replies += [self.read_line() for i in range(n_queries)]
+        if len(replies) != len(queries):
+            raise ValueError(f'Got {len(replies)} replies to {len(queries)} queries: {replies}')
+
+        parsed_replies = []
+        for reply, parser in zip(replies, parsers):
+            if parser is bool:
+                parser = parse_bool
+            if parser is not None:
+                reply = parser(reply.strip())
+            parsed_replies.append(reply)
+
+        if names is None:
+            return tuple(parsed_replies)
+        else:
+            return dict(zip(names, parsed_replies))
+
     def read_line(self):
         """
-        Reads a line of data from the device
+        Reads a line of data from the device. Any commands queued in a batch are sent first.
 
         :returns line: Line of read data which ends in the read termination character. Termination character is stripped.
         """
+        self.flush_batch()
         if self.lib_type == 'pyvisa':
             return self.device.read()
         elif self.lib_type == 'pyserial':
@@ -194,10 +521,13 @@ class SCPIDevice:
 
     def write_line(self, string):
         """
-        Writes a line of data to the device. Do NOT include the termination character, this method handles that.
+        Writes a line of data to the device. Do NOT include the termination character, this method handles that. Inside a batch, the line is queued instead.
 
         :param string: String to be written to device
         """
+        if self._batch_queue is not None:
+            self._batch_queue.append(string)
+            return
         if self.lib_type == 'pyvisa':
             self.device.write(string)
         elif self.lib_type == 'pyserial':
@@ -206,20 +536,284 @@ class SCPIDevice:
 
     def read_bytes(self, n_bytes):
         """
-        Reads a series of bytes from the device
+        Reads a series of bytes from the device. Any commands queued in a batch are sent first.
 
         :param n_bytes: Number of bytes to be read
         :returns byte_array: Array of bytes
         """
+        self.flush_batch()
         if self.lib_type == 'pyvisa':
             return self.device.read_bytes(n_bytes)
         elif self.lib_type == 'pyserial':
             return self.device.read(size=n_bytes)
 
+    def clear_input(self):
+        """
+        Discards any data the device has sent which has not been read, such as the rest of a reply cut short by a timeout, so that it is not read as the reply to the next query
+        """
+        if self.lib_type == 'pyvisa':
+            self.device.clear()
+        else:
+            self.device.reset_input_buffer()
+
+    def read_binary_block(
+            self, dtype=np.uint8, out=None, length_header=True, n_bytes=None,
+            chunk_bytes=None, progress=None, timeout=None, allow_short=False):
+        """
+        Reads an IEEE 488.2 definite-length binary block (#<n><length><payload>) straight into a numpy buffer, without intermediate copies of the payload.
+
+        :param dtype: Data type of the block elements
+        :param out: Preallocated contiguous array or writable buffer to read the payload into. Allocated if not specified.
+        :param length_header: Whether a <n><length> header follows the leading #. Set to False for devices which send only the # before a payload of known size.
+        :param n_bytes: Payload size in bytes. Required if the device does not send the length.
+        :param chunk_bytes: Maximum number of bytes per read. Reads the whole payload at once if None.
+        :param progress: Function called as progress(n_read, n_bytes) after every chunk
+        :param timeout: Time (s) after which a read returning no data ends the block. If None, the first read returning no data ends the block.
+        :param allow_short: Whether to return the complete elements of a block which ended early rather than raising a ValueError
+        :returns data: Array of dtype viewing the payload
+        """
+        self.flush_batch()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        header = self._read_exactly(1, deadline=deadline)
+        if len(header) == 0:
+            raise ValueError('No data received from device.')
+        if header != b'#':
+            raise ValueError(
+                f'Did not receive block header character #. Actual character is {header}')
+
+        if length_header:
+            n_digits = int(self._read_exactly(1, deadline=deadline))
+            if n_digits == 0:
+                if n_bytes is None:
+                    raise ValueError('Indefinite-length block received, but n_bytes not specified.')
+            else:
+                n_bytes = int(self._read_exactly(n_digits, deadline=deadline))
+        if n_bytes is None:
+            raise ValueError('Block has no length header, but n_bytes not specified.')
+
+        if out is None:
+            out = np.empty(n_bytes // np.dtype(dtype).itemsize, dtype=dtype)
+        buffer = memoryview(out).cast('B')
+        if buffer.nbytes < n_bytes:
+            raise ValueError(f'Output buffer of {buffer.nbytes} bytes is too small for block of {n_bytes} bytes.')
+        buffer = buffer[:n_bytes]
+
+        n_read = self._read_into(
+                buffer, chunk_bytes=chunk_bytes, progress=progress,
+                deadline=deadline)
+        if n_read < n_bytes:
+            if not allow_short:
+                raise ValueError(f'Received only {n_read} of {n_bytes} bytes of block.')
+            itemsize = np.dtype(dtype).itemsize
+            buffer = buffer[:n_read - n_read % itemsize]
+        return np.frombuffer(buffer, dtype=dtype)
+
+    def _read_exactly(self, n_bytes, deadline=None):
+        """
+        Reads a small number of bytes, e.g. a block header
+
+        :param n_bytes: Number of bytes to read
+        :param deadline: time.monotonic() time until which to keep waiting for data
+        :returns data: bytes object, shorter than n_bytes if the read timed out
+        """
+        data = bytearray(n_bytes)
+        n_read = self._read_into(memoryview(data), deadline=deadline)
+        return bytes(data[:n_read])
+
+    def _read_into(self, buffer, chunk_bytes=None, progress=None, deadline=None):
+        """
+        Reads bytes from the device into a writable buffer until it is full or the read times out. Each read is bounded by the device timeout, so a large buffer should be read in chunks small enough to arrive within it.
+
+        :param buffer: Writable memoryview of bytes
+        :param chunk_bytes: Maximum number of bytes per read. Reads as much as possible at once if None.
+        :param progress: Function called as progress(n_read, n_bytes) after every read which returned data
+        :param deadline: time.monotonic() time until which reads returning no data are retried. If None, the first read returning no data ends the read.
+        :returns n_read: Number of bytes read
+        """
+        n_bytes = buffer.nbytes
+        if chunk_bytes is None:
+            chunk_bytes = n_bytes
+        n_read = 0
+        while n_read < n_bytes:
+            chunk = buffer[n_read:n_read + chunk_bytes]
+            if self.lib_type == 'pyvisa':
+                try:
+                    data = self.device.read_bytes(chunk.nbytes)
+                except pyvisa.errors.VisaIOError as e:
+                    if e.error_code != pyvisa.constants.StatusCode.error_timeout:
+                        raise
+                    data = b''
+                chunk[:len(data)] = data
+                n_new = len(data)
+            else:
+                n_new = self.device.readinto(chunk)
+
+            if n_new:
+                n_read += n_new
+                if progress is not None:
+                    progress(n_read, n_bytes)
+            elif deadline is None or time.monotonic() >= deadline:
+                break
+        return n_read
+
+    @contextmanager
+    def batch(self):
+        """
+        Context in which written commands are queued rather than sent, and are then sent as as few compound commands as possible when the context exits. Reading from the device inside the context sends the commands queued so far, so queries still work. If an exception is raised inside the context, the commands still queued are discarded, and the driver's private attributes, which setters update as they queue commands, are restored to match the commands actually sent.
+
+        Usage::
+
+            with keithley.batch():
+                keithley.mode = 'voltage'
+                keithley.current_compliance = 1e-3
+        """
+        if self._batch_queue is not None:
+            yield self # Nested batches join the outermost one
+            return
+
+        self._batch_queue = []
+        self._batch_snapshot = self._driver_state()
+        try:
+            yield self
+        except BaseException:
+            self._batch_queue = None
+            vars(self).update(self._batch_snapshot)
+            raise
+        try:
+            self.flush_batch()
+        finally:
+            self._batch_queue = None
+
+    def flush_batch(self):
+        """
+        Sends all commands queued in the current batch
+        """
+        if not self._batch_queue:
+            return
+        commands = self._batch_queue
+        self._batch_queue = None
+        try:
+            for message in self.join_commands(commands):
+                self.write_line(message)
+            self._batch_snapshot = self._driver_state() # The device now matches the driver
+        finally:
+            self._batch_queue = []
+
+    def _driver_state(self):
+        """
+        Snapshot of the driver's private attributes. Containers are copied, since setters may change them in place.
+
+        :returns state: Dictionary of {attribute: value}
+        """
+        return {name: copy.copy(value) if isinstance(value, (dict, list, set)) else value
+                for name, value in vars(self).items()
+                if name.startswith('_') and name not in ('_batch_queue', '_batch_snapshot')}
+
+    def join_commands(self, commands):
+        """
+        Joins commands into compound commands no longer than MAX_MESSAGE_LENGTH. Devices which do not support compound commands get each command as its own message.
+
+        :param commands: List of commands
+        :returns messages: List of messages to write to the device
+        """
+        return [message for message, n_commands in self._join_groups(commands)]
+
+    def _join_groups(self, commands):
+        """
+        Joins commands into compound commands, see join_commands()
+
+        :param commands: List of commands
+        :returns groups: List of (message, n_commands) tuples, where n_commands is the number of commands joined into the message
+        """
+        if len(commands) == 0:
+            return []
+        if not self.SUPPORTS_COMPOUND_COMMANDS:
+            return [(command, 1) for command in commands]
+
+        groups = [(commands[0], 1)]
+        for command in commands[1:]:
+            message, n_commands = groups[-1]
+            joined = message + self.command_separator(command) + command
+            if len(joined) > self.MAX_MESSAGE_LENGTH:
+                groups.append((command, 1))
+            else:
+                groups[-1] = (joined, n_commands + 1)
+        return groups
+
+    def cached_query(self, key, command, parser=None):
+        """
+        Queries a setting of the device, or returns the cached value if the state mirror is enabled and holds the setting.
+
+        :param key: Name of the setting in the state mirror
+        :param command: Query to send to the device
+        :param parser: Function applied to the reply (e.g. float, int, bool)
+        :returns value: The parsed value of the setting
+        """
+        if self.cache_state and key in self._state:
+            return self._state[key]
+        value = self.query_many([command], parsers=[parser])[0]
+        if self.cache_state:
+            self._state[key] = value
+        return value
+
+    def cached_write(self, key, value, command):
+        """
+        Writes a setting to the device and records it in the state mirror. If the state mirror is enabled and already holds this value, nothing is written.
+
+        :param key: Name of the setting in the state mirror
+        :param value: New value of the setting
+        :param command: Command which sets the value on the device
+        """
+        if self.cache_state and key in self._state and self._state[key] == value:
+            return
+        self.write_line(command)
+        if self.cache_state:
+            self._state[key] = value
+
+    def invalidate(self, key=None):
+        """
+        Removes settings from the state mirror, so that they are read from the device on next access
+
+        :param key: Name of the setting to remove. If None, all settings are removed.
+        """
+        if key is None:
+            self._state.clear()
+        else:
+            self._state.pop(key, None)
+
+    def refresh(self):
+        """
+        Re-reads every setting in STATE_QUERIES from the device in a single exchange and replaces the state mirror with them.
+
+        :returns state: Dictionary of {setting: value}
+        """
+        self._state = {}
+        if len(self.STATE_QUERIES) == 0:
+            return {}
+        state = self.query_many(
+                {key: query for key, (query, parser) in self.STATE_QUERIES.items()},
+                parsers={key: parser for key, (query, parser) in self.STATE_QUERIES.items()})
+        self._state = dict(state)
+        return state
+
+    def command_separator(self, command):
+        """
+        Separator placed before a command in a compound command. Commands are rooted with a leading colon, since SCPI otherwise interprets a command relative to the subsystem of the previous one.
+
+        :param command: The command following the separator
+        """
+        if command.startswith(('*', ':')):
+            return ';'
+        else:
+            return ';:'
+
     def close(self):
         """
-        Closes device port so it can be used by another program
+        Closes device port so it can be used by another program. Pooled VISA sessions are instead returned to the pool, and are closed by session_pool.close_sessions() or when the interpreter exits.
         """
+        if self.lib_type == 'pyvisa' and self.use_pool:
+            if release_session(self.device):
+                return
         self.device.close()
 
     def identify(self):
@@ -236,3 +830,4 @@ class SCPIDevice:
         Resets the device using the appropriate SCPI command
         """
         self.write_line('*RST')
+        self.invalidate()
@@ -10,10 +10,12 @@ import numpy as np
 import pandas as pd
 
 class TEController(SCPIDevice):
+    SUPPORTS_COMPOUND_COMMANDS = False
+
     def __init__(self, lib_type='pyserial',
             device_name='Arduino Nano TEC Controller',
             read_termination='\r\n', write_termination='\n',
-            baud_rate=115200):
+            baud_rate=115200, **kwargs):
         """
         Implementation of communication device for my temperature controller.
 
@@ -21,13 +23,15 @@ class TEController(SCPIDevice):
         :param device_name: Device name as it responds to the identify command
         :param read_termination: Read termination character
         :param write_termination: Write termination character
+        :param kwargs: Additional arguments passed to SCPIDevice
 
         """
         self.lib_type = lib_type
         super().__init__(lib_type=lib_type, device_name=device_name,
                 read_termination=read_termination,
                 write_termination=write_termination,
-                baud_rate=baud_rate)
+                baud_rate=baud_rate,
+                **kwargs)
         self._mode = 'temperature'
         self._remote = False
         time.sleep(2) # Wait for Arduino initialization
@@ -0,0 +1,87 @@
+"""
+On-disk cache of the resource (VISA resource name or serial port) at which each device was last found, so that devices can be reopened without enumerating every resource.
+"""
+import os
+import json
+
+DISCOVERY_CACHE_FILE = os.path.join(
+        os.path.expanduser('~'), '.scippy', 'discovery_cache.json')
+
+def load_discovery_cache(filename=None):
+    """
+    Loads the discovery cache from disk. A missing or unreadable cache is treated as empty.
+
+    :param filename: Cache file. Defaults to DISCOVERY_CACHE_FILE
+    :returns cache: Dictionary of {lib_type: {device_name: resource_name}}
+    """
+    if filename is None:
+        filename = DISCOVERY_CACHE_FILE
+    try:
+        with open(filename, 'r') as cache_file:
+            cache = json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict):
+        return {}
+    return cache
+
+def save_discovery_cache(cache, filename=None):
+    """
+    Writes the discovery cache to disk. The file is replaced atomically so that concurrently running scripts never see a partially written cache.
+
+    :param cache: Dictionary of {lib_type: {device_name: resource_name}}
+    :param filename: Cache file. Defaults to DISCOVERY_CACHE_FILE
+    """
+    if filename is None:
+        filename = DISCOVERY_CACHE_FILE
+    temp_filename = f'{filename}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        with open(temp_filename, 'w') as cache_file:
+            json.dump(cache, cache_file, indent=2)
+        os.replace(temp_filename, filename)
+    except OSError:
+        pass # The cache is only an optimization. Discovery still works without it.
+
+def cached_resource(lib_type, device_name, filename=None):
+    """
+    Looks up the resource at which a device was last found
+
+    :param lib_type: "pyvisa" or "pyserial"
+    :param device_name: Device name as it responds to the identify command
+    :returns resource_name: Cached resource name, or None if the device is not cached
+    """
+    cache = load_discovery_cache(filename)
+    return cache.get(lib_type, {}).get(device_name)
+
+def update_discovery_cache(lib_type, device_name, resource_name, filename=None):
+    """
+    Records the resource at which a device was found
+
+    :param lib_type: "pyvisa" or "pyserial"
+    :param device_name: Device name as it responds to the identify command
+    :param resource_name: Resource name or serial port of the device
+    """
+    cache = load_discovery_cache(filename)
+    if cache.get(lib_type, {}).get(device_name) == resource_name:
+        return
+    cache.setdefault(lib_type, {})[device_name] = resource_name
+    save_discovery_cache(cache, filename)
+
+def invalidate_discovery_cache(lib_type=None, device_name=None, filename=None):
+    """
+    Removes entries from the discovery cache.
+
+    :param lib_type: "pyvisa" or "pyserial". If None, the entire cache is cleared.
+    :param device_name: Device to remove. If None, all devices for lib_type are removed.
+    """
+    cache = load_discovery_cache(filename)
+    if lib_type is None:
+        cache = {}
+    elif device_name is None:
+        cache.pop(lib_type, None)
+    elif device_name in cache.get(lib_type, {}):
+        del cache[lib_type][device_name]
+    else:
+        return
+    save_discovery_cache(cache, filename)
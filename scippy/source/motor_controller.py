@@ -1,6 +1,12 @@
 import time
+import threading
+from concurrent.futures import Future
 
 class MotorController:
+    MOTOR_PERIOD_UNIT = 1e-3 # s. The firmware reports the step period in milliseconds.
+    MOTOR_SETTLE_TIME = 0.002 # s. Minimum wait before asking whether the motor has stopped.
+    MOTOR_POLL_INTERVAL = 0.05 # s. Polling interval if the motor is still rotating after its predicted move time.
+    _motor_period = None # Step period last read from or written to the device
 
     @property
     def motor_position(self):
@@ -50,16 +56,22 @@ class MotorController:
         rotation = bool(int(rotation_text))
         return rotation
 
-    def wait_for_motor(self):
-        time.sleep(0.05)
+    def wait_for_motor(self, move_time=0):
+        """
+        Waits for the motor to stop rotating. Sleeps through the predicted duration of the move, then confirms with a single query that the motor has stopped, only polling if it has not.
+
+        :param move_time: Predicted duration (s) of the move, see start_rotation()
+        """
+        time.sleep(max(move_time, self.MOTOR_SETTLE_TIME))
         while(self.motor_rotating == True):
-            time.sleep(0.05)
+            time.sleep(self.MOTOR_POLL_INTERVAL)
 
-    def rotate_motor(self, n_steps):
+    def start_rotation(self, n_steps):
         """
-        Rotates the stepper motor by some integer number of steps.
+        Starts rotating the stepper motor by some integer number of steps, without waiting for it to finish.
 
         :param n_steps: The number of stepper motor steps to take. Positive = clockwise, negative = counterclockwise.
+        :returns move_time: Predicted duration (s) of the move, from the motor period
         """
         if self.motor_enable== False:
             self.motor_enable = True
@@ -70,30 +82,57 @@ class MotorController:
             self.motorDirection = 0
 
         self.write_line('MOTOR:ROTATE ' + str(n_steps))
+        return abs(n_steps) * self.motor_period * self.MOTOR_PERIOD_UNIT
 
-        # Not having this here was causing endless headaches. 
-        # Better to just make this a blocking event.
-        self.wait_for_motor()
+    def rotate_motor(self, n_steps, wait=True):
+        """
+        Rotates the stepper motor by some integer number of steps.
+
+        :param n_steps: The number of stepper motor steps to take. Positive = clockwise, negative = counterclockwise.
+        :param wait: Whether to wait for the rotation to finish. If False, the rotation is awaited in a background thread. Do not otherwise communicate with the device until the returned future is done.
+        :returns future: concurrent.futures.Future which is done when the motor has stopped
+        """
+        move_time = self.start_rotation(n_steps)
+        future = Future()
+        if wait:
+            # Not having this here was causing endless headaches.
+            # Better to just make this a blocking event.
+            self.wait_for_motor(move_time)
+            future.set_result(None)
+            return future
+
+        def wait_in_background():
+            try:
+                self.wait_for_motor(move_time)
+                future.set_result(None)
+            except Exception as e:
+                future.set_exception(e)
+        threading.Thread(target=wait_in_background, daemon=True).start()
+        return future
 
     @property
     def motor_enable(self):
-        self.write_line('MOTOR:ENABLED?')
-        enabled = bool(int(self.read_line()))
+        enabled = self.cached_query('motor_enable', 'MOTOR:ENABLED?', bool)
         return enabled
 
     @motor_enable.setter
     def motor_enable(self, motorEnable):
         if motorEnable == True:
-            self.write_line('MOTOR:ENABLE')
+            self.cached_write('motor_enable', True, 'MOTOR:ENABLE')
         elif motorEnable == False:
-            self.write_line('MOTOR:DISABLE')
+            self.cached_write('motor_enable', False, 'MOTOR:DISABLE')
 
     @property
     def motor_period(self):
-        self.write_line('MOTOR:PERIOD?')
-        motorPeriod = int(self.read_line())
-        return motorPeriod
+        """
+        Time between motor steps, in units of MOTOR_PERIOD_UNIT. Read from the device once and then kept locally, since every move needs it to predict its duration.
+        """
+        if self._motor_period is None:
+            self.write_line('MOTOR:PERIOD?')
+            self._motor_period = int(self.read_line())
+        return self._motor_period
 
     @motor_period.setter
     def motor_period(self, period):
         self.write_line('MOTOR:PERIOD ' + str(int(period)))
+        self._motor_period = int(period)
@@ -0,0 +1,82 @@
+"""
+Noise analysis of streamed ADC data
+"""
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+from scipy.signal import get_window
+
+class WelchPSD:
+    def __init__(self, sampling_frequency, n_per_segment=1024, n_overlap=None, window='hann'):
+        """
+        Running estimate of the one-sided power spectral density by Welch's method, matching scipy.signal.welch with constant detrending and density scaling. Samples are added one chunk at a time. Only the running sum of the segment periodograms and the samples of the next, incomplete segment are kept, so memory does not grow with the number of samples.
+
+        :param sampling_frequency: Sampling frequency (Hz) of the samples
+        :param n_per_segment: Number of samples per segment
+        :param n_overlap: Number of samples by which consecutive segments overlap. Defaults to half a segment.
+        :param window: Window applied to each segment, either a name understood by scipy.signal.get_window or an array of length n_per_segment
+        """
+        if n_overlap is None:
+            n_overlap = n_per_segment // 2
+        if n_overlap >= n_per_segment:
+            raise ValueError(f'Overlap of {n_overlap} samples must be smaller than the segment length of {n_per_segment} samples.')
+        self.sampling_frequency = sampling_frequency
+        self.n_per_segment = n_per_segment
+        self.n_overlap = n_overlap
+        self._step = n_per_segment - n_overlap
+
+        if isinstance(window, str):
+            window = get_window(window, n_per_segment)
+        self._window = np.asarray(window, dtype=np.float64)
+        if len(self._window) != n_per_segment:
+            raise ValueError(f'Window has {len(self._window)} samples, but segments have {n_per_segment} samples.')
+        self._scale = np.full(n_per_segment // 2 + 1,
+            2 / (sampling_frequency * np.sum(self._window**2)))
+        self._scale[0] /= 2 # DC and Nyquist appear only once in the one-sided spectrum
+        if n_per_segment % 2 == 0:
+            self._scale[-1] /= 2
+        self.frequencies = np.fft.rfftfreq(n_per_segment, 1 / sampling_frequency)
+        self.clear()
+
+    def clear(self):
+        """
+        Discards the accumulated spectrum and any samples not yet in a segment
+        """
+        self._periodogram_sum = np.zeros(len(self.frequencies))
+        self._tail = np.zeros(0)
+        self.n_segments = 0
+
+    def update(self, samples, contiguous=True):
+        """
+        Adds the segments completed by a chunk of samples to the running estimate
+
+        :param samples: Array of samples
+        :param contiguous: Whether the chunk directly follows the previous one in time. If False, such as for the separate captures yielded by MCP3561.stream(), the samples carried over from the previous chunk are discarded rather than joined into a segment across the gap.
+        :returns n_segments: Number of segments added
+        """
+        if not contiguous:
+            self._tail = np.zeros(0)
+        samples = np.concatenate((self._tail, np.asarray(samples, dtype=np.float64)))
+        if len(samples) < self.n_per_segment:
+            self._tail = samples
+            return 0
+
+        n_segments = (len(samples) - self.n_per_segment) // self._step + 1
+        segments = as_strided(
+            samples, shape=(n_segments, self.n_per_segment),
+            strides=(self._step * samples.strides[0], samples.strides[0]),
+            writeable=False)
+        segments = segments - segments.mean(axis=1, keepdims=True)
+        segments *= self._window
+        spectra = np.fft.rfft(segments, axis=1) # All segments in one batched transform
+        self._periodogram_sum += np.sum(spectra.real**2 + spectra.imag**2, axis=0)
+        self.n_segments += n_segments
+        self._tail = samples[n_segments * self._step:].copy()
+        return n_segments
+
+    @property
+    def psd(self):
+        """
+        Power spectral density (units of the samples squared per Hz) at each of the frequencies, averaged over every segment so far. NaN before the first complete segment.
+        """
+        with np.errstate(invalid='ignore'):
+            return self._periodogram_sum * self._scale / self.n_segments
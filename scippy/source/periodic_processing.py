@@ -0,0 +1,186 @@
+"""
+Processing of signals which are periodic in an external reference, such as a chopper or function generator, whose periods are marked by synchronization indices (see MCP3561.sync_data). Every processor works on one chunk at a time, so captures of any length can be processed as they are streamed.
+"""
+import numpy as np
+
+def period_labels(sync_indices):
+    """
+    Labels every sample between the first and last synchronization index with its period and its position within the period
+
+    :param sync_indices: Strictly increasing array of at least two synchronization indices
+    :returns periods, offsets, period_lengths: For each sample from sync_indices[0] up to sync_indices[-1], the index of its period and its offset from the start of the period, and the length of each period
+    """
+    period_lengths = np.diff(sync_indices)
+    periods = np.repeat(np.arange(len(period_lengths)), period_lengths)
+    offsets = np.arange(sync_indices[-1] - sync_indices[0]) - \
+        np.repeat(sync_indices[:-1] - sync_indices[0], period_lengths)
+    return periods, offsets, period_lengths
+
+def lock_in(voltages, sync_indices, harmonic=1):
+    """
+    Demodulates a signal at a harmonic of its reference, giving one in-phase and one quadrature amplitude for every complete reference period. The phase of each sample is its position within its own period, so the reference frequency may drift. A signal A*cos(2*pi*harmonic*t/T - theta) gives in-phase and quadrature amplitudes A*cos(theta) and A*sin(theta).
+
+    :param voltages: Array of samples
+    :param sync_indices: Indices of the samples at which each reference period starts
+    :param harmonic: Harmonic of the reference frequency to demodulate at
+    :returns in_phase, quadrature: Arrays with one amplitude per complete period. Samples before the first or after the last synchronization index are ignored.
+    """
+    sync_indices = np.unique(np.asarray(sync_indices, dtype=np.int64))
+    if len(sync_indices) < 2:
+        return np.zeros(0), np.zeros(0)
+    periods, offsets, period_lengths = period_labels(sync_indices)
+    phase = 2 * np.pi * harmonic * offsets / period_lengths[periods]
+    period_voltages = voltages[sync_indices[0]:sync_indices[-1]]
+    n_periods = len(period_lengths)
+    in_phase = 2 * np.bincount(
+        periods, weights=period_voltages * np.cos(phase),
+        minlength=n_periods) / period_lengths
+    quadrature = 2 * np.bincount(
+        periods, weights=period_voltages * np.sin(phase),
+        minlength=n_periods) / period_lengths
+    return in_phase, quadrature
+
+class PeriodicProcessor:
+    def __init__(self):
+        """
+        Base class for processors which work on complete reference periods of a chunked signal. Samples after the last synchronization index of a chunk belong to a period which is not yet complete. They are carried over and processed with the next chunk. Subclasses implement process_periods().
+        """
+        self.reset()
+
+    def reset(self):
+        """
+        Discards any partial period carried over from the previous chunk
+        """
+        self._tail = None # Samples since the last synchronization index, or None before the first
+        self._next_offset = None
+
+    def update(self, voltages, sync_indices, sample_offset=None, contiguous=True):
+        """
+        Processes a chunk of samples, such as one yielded by MCP3561.stream()
+
+        :param voltages: Array of samples
+        :param sync_indices: Indices of the samples at which each reference period starts, counted from the same origin as sample_offset
+        :param sample_offset: Index of the first sample of the chunk. If given and the chunk does not directly follow the previous one, the partial period carried over is discarded. If None, chunks are assumed to be contiguous and sync_indices are counted from the start of the chunk.
+        :param contiguous: Whether the chunk directly follows the previous one in time. If False, such as for the separate captures yielded by MCP3561.stream(), the partial period carried over is discarded.
+        :returns result: Result of process_periods() for the periods completed by this chunk
+        """
+        voltages = np.asarray(voltages)
+        sync_indices = np.asarray(sync_indices, dtype=np.int64)
+        if sample_offset is None:
+            sample_offset = 0 if self._next_offset is None else self._next_offset
+        else:
+            sync_indices = sync_indices - sample_offset
+            if sample_offset != self._next_offset:
+                self._tail = None # The partial period is not contiguous with this chunk
+        if not contiguous:
+            self._tail = None
+        self._next_offset = sample_offset + len(voltages)
+
+        if self._tail is not None:
+            sync_indices = np.concatenate(([0], sync_indices + len(self._tail)))
+            voltages = np.concatenate((self._tail, voltages))
+        sync_indices = np.unique(sync_indices[
+            (sync_indices >= 0) & (sync_indices < len(voltages))])
+
+        if len(sync_indices) == 0:
+            return self.process_periods(voltages[:0], sync_indices)
+        self._tail = voltages[sync_indices[-1]:].copy()
+        return self.process_periods(voltages[:sync_indices[-1] + 1], sync_indices)
+
+    def update_dataframe(self, data, column=None):
+        """
+        Processes a separate capture, such as a DataFrame returned by MCP3561.generate_data(). Periods are not carried over between captures.
+
+        :param data: pandas DataFrame with a Sync column
+        :param column: Name of the column to process. Defaults to the column after the time column.
+        :returns result: Result of process_periods() for the complete periods of the capture
+        """
+        if column is None:
+            column = data.columns[1]
+        self.reset()
+        result = self.update(
+                data[column].values, np.flatnonzero(data['Sync'].values))
+        self.reset()
+        return result
+
+    def process_periods(self, voltages, sync_indices):
+        """
+        Processes complete reference periods. Implemented by subclasses.
+
+        :param voltages: Array of samples, ending with the first sample of the next, incomplete period
+        :param sync_indices: Indices of the samples at which each period starts. The last index starts the incomplete period.
+        """
+        raise NotImplementedError
+
+class LockInAmplifier(PeriodicProcessor):
+    def __init__(self, harmonic=1):
+        """
+        Software lock-in amplifier which demodulates a chunked signal one reference period at a time. See lock_in()
+
+        :param harmonic: Harmonic of the reference frequency to demodulate at
+        """
+        self.harmonic = harmonic
+        super().__init__()
+
+    def process_periods(self, voltages, sync_indices):
+        """
+        Demodulates complete reference periods
+
+        :returns in_phase, quadrature: Arrays with one amplitude per period completed
+        """
+        return lock_in(voltages, sync_indices, harmonic=self.harmonic)
+
+class BoxcarAverager(PeriodicProcessor):
+    def __init__(self, n_bins):
+        """
+        Boxcar averager which folds a chunked signal on its reference periods into a single averaged waveform. Each period is divided into n_bins equal bins, so periods of slightly different length are stretched onto the same bins. Only the running sum and count of each bin are kept, so any number of captures can be averaged in constant memory.
+
+        :param n_bins: Number of bins per period
+        """
+        self.n_bins = n_bins
+        self._sums = np.zeros(n_bins)
+        self._counts = np.zeros(n_bins, dtype=np.int64)
+        self.n_periods = 0
+        super().__init__()
+
+    def clear(self):
+        """
+        Discards the accumulated average and any partial period
+        """
+        self._sums[:] = 0
+        self._counts[:] = 0
+        self.n_periods = 0
+        self.reset()
+
+    @property
+    def phases(self):
+        """
+        Phase of the center of each bin, as a fraction of a period
+        """
+        return (np.arange(self.n_bins) + 0.5) / self.n_bins
+
+    @property
+    def average(self):
+        """
+        Averaged waveform, with one value per bin. Bins without samples are NaN.
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self._sums / self._counts
+
+    def process_periods(self, voltages, sync_indices):
+        """
+        Adds complete reference periods to the running average
+
+        :returns n_periods: Number of periods added
+        """
+        sync_indices = np.unique(np.asarray(sync_indices, dtype=np.int64))
+        if len(sync_indices) < 2:
+            return 0
+        periods, offsets, period_lengths = period_labels(sync_indices)
+        bins = offsets * self.n_bins // period_lengths[periods]
+        self._sums += np.bincount(
+            bins, weights=voltages[sync_indices[0]:sync_indices[-1]],
+            minlength=self.n_bins)
+        self._counts += np.bincount(bins, minlength=self.n_bins)
+        self.n_periods += len(period_lengths)
+        return len(period_lengths)
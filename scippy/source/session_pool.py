@@ -0,0 +1,111 @@
+"""
+Process-wide pyvisa ResourceManager and pool of open VISA sessions. Sessions released by a device stay open, so that reopening the same instrument is a lookup rather than a reopen and identify.
+"""
+import atexit
+import threading
+import pyvisa
+
+_lock = threading.RLock()
+_resource_manager = None
+_sessions = {} # {resource_name: {'device': ..., 'device_name': ..., 'users': ..., 'timeout': ...}}
+
+class ResourceBusyError(RuntimeError):
+    """
+    Raised when a device asks for a pooled session which another device is using
+    """
+
+def get_resource_manager():
+    """
+    Gets the ResourceManager shared by every device in this process, creating it on first use
+
+    :returns rm: pyvisa ResourceManager
+    """
+    global _resource_manager
+    with _lock:
+        if _resource_manager is None:
+            _resource_manager = pyvisa.ResourceManager()
+        return _resource_manager
+
+def acquire_session(resource_name='', device_name=''):
+    """
+    Looks up an open session by resource name or, if no resource name is given, by device name, and marks it as in use. The session's timeout is reset to its value when it was opened. A session in use by another device is never handed out, since the two devices would interleave their I/O on it.
+
+    :param resource_name: VISA resource name of the session
+    :param device_name: Device name as it responds to the identify command
+    :returns session: (resource_name, device) tuple, or None if no matching session is open or neither name is given
+    """
+    with _lock:
+        for rname, session in _sessions.items():
+            if resource_name != '':
+                is_match = rname == resource_name
+            else:
+                is_match = device_name != '' and device_name == session['device_name']
+            if not is_match:
+                continue
+            if session['users'] > 0:
+                raise ResourceBusyError(f'{rname} is already open by another device. Close that device first, or pass use_pool=False to open a separate session.')
+            session['users'] += 1
+            session['device'].timeout = session['timeout']
+            return rname, session['device']
+    return None
+
+def session_in_use(resource_name):
+    """
+    Whether a pooled session is in use by a device
+
+    :param resource_name: VISA resource name of the session
+    :returns in_use: True if the session is pooled and in use
+    """
+    with _lock:
+        session = _sessions.get(resource_name)
+        return session is not None and session['users'] > 0
+
+def register_session(resource_name, device, device_name):
+    """
+    Adds a newly opened session to the pool and marks it as in use
+
+    :param resource_name: VISA resource name of the session
+    :param device: Open pyvisa resource
+    :param device_name: Device name as it responds to the identify command
+    """
+    with _lock:
+        _sessions[resource_name] = {
+            'device': device, 'device_name': device_name, 'users': 1,
+            'timeout': device.timeout}
+
+def release_session(device):
+    """
+    Marks a session as no longer used by one device. The session stays open for reuse.
+
+    :param device: Open pyvisa resource
+    :returns is_pooled: Whether the device belongs to the pool
+    """
+    with _lock:
+        for session in _sessions.values():
+            if session['device'] is device:
+                session['users'] = max(session['users'] - 1, 0)
+                return True
+    return False
+
+def pooled_resources():
+    """
+    Resource names of all sessions in the pool
+
+    :returns resource_names: List of resource names
+    """
+    with _lock:
+        return list(_sessions.keys())
+
+def close_sessions():
+    """
+    Closes every session in the pool, whether or not it is in use. Called automatically when the interpreter exits.
+    """
+    with _lock:
+        for session in _sessions.values():
+            try:
+                session['device'].close()
+            except pyvisa.errors.Error:
+                pass
+        _sessions.clear()
+
+atexit.register(close_sessions)
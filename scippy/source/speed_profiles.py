@@ -0,0 +1,55 @@
+"""
+Measurement speed profiles shared by the source-measure units. Each profile sets the throughput-critical settings together. "normal" matches the instruments' reset defaults.
+"""
+SPEED_PROFILES = {
+    'fast': {
+        'nplc': 0.01, 'autozero': False, 'display': False,
+        'filter_count': 0, 'source_delay': 0, 'autorange': False,
+    },
+    'normal': {
+        'nplc': 1, 'autozero': True, 'display': True,
+        'filter_count': 0, 'source_delay': None, 'autorange': True,
+    },
+    'hi_accuracy': {
+        'nplc': 10, 'autozero': True, 'display': True,
+        'filter_count': 10, 'source_delay': None, 'autorange': True,
+    },
+}
+
+AUTOZERO_FACTOR = 3 # Autozero measures the reference and zero as well as the signal
+AUTO_SOURCE_DELAY = 1e-3 # s. Typical automatic source delay
+
+def speed_settings(profile='normal', **overrides):
+    """
+    Looks up the settings of a speed profile
+
+    :param profile: "fast", "normal", or "hi_accuracy"
+    :param overrides: Settings which replace those of the profile: nplc (integration time in power line cycles), autozero (bool), display (bool, whether the front panel is updated), filter_count (number of readings averaged by the repeat filter, 0 for none), source_delay (s, None for automatic), and autorange (bool)
+    :returns settings: Dictionary of settings
+    """
+    if profile not in SPEED_PROFILES:
+        raise ValueError(f'Speed profile {profile} not recognized. Available profiles are {list(SPEED_PROFILES.keys())}')
+    settings = dict(SPEED_PROFILES[profile])
+    for key in overrides:
+        if key not in settings:
+            raise ValueError(f'Setting {key} not recognized. Available settings are {list(settings.keys())}')
+    settings.update(overrides)
+    return settings
+
+def readings_per_second(settings, line_frequency=60, overhead=1e-3):
+    """
+    Rough estimate of the number of readings per second with the given settings, from the integration time, autozero, filter, and source delay. Ignores range changes and data transfer.
+
+    :param settings: Dictionary of settings, see speed_settings()
+    :param line_frequency: Power line frequency (Hz)
+    :param overhead: Fixed time (s) the instrument spends on each reading
+    :returns rate: Readings per second
+    """
+    integration_time = settings['nplc'] / line_frequency
+    if settings['autozero']:
+        integration_time *= AUTOZERO_FACTOR
+    integration_time *= max(settings['filter_count'], 1)
+    source_delay = settings['source_delay']
+    if source_delay is None:
+        source_delay = AUTO_SOURCE_DELAY
+    return 1 / (integration_time + source_delay + overhead)
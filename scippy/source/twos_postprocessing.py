@@ -1,30 +1,50 @@
 import numpy as np
 
 """
-Convert a twos-complement set of bytes (1, 2, 3, etc.) into a floating-point value.
-"""
-def twos_to_integer(twosBytes, firstByte='msb', bytesPerInteger=3):
-    number = 0.0
-    numberBytes = len(twosBytes)
-    numberIntegers = int(numberBytes / bytesPerInteger)
-    twosBytes = twosBytes.reshape(numberIntegers, bytesPerInteger)
+Convert a twos-complement set of bytes (1, 2, 3, or 4 bytes per integer) into integers. Fully vectorized: the bytes of each integer are placed in the most significant end of a 32-bit word, so that its sign bit lands on the sign bit of the word, and the word is then shifted back down, which extends the sign.
 
-    if(firstByte == 'msb'):
-        for i in range(bytesPerInteger):
-            number += np.power(256, bytesPerInteger - 1 - i) * twosBytes[:, i]
+:param twosBytes: Array of bytes. Its length must be a multiple of bytesPerInteger
+:param firstByte: Whether the most significant byte ("msb") or least significant byte ("lsb") of each integer comes first
+:param bytesPerInteger: Number of bytes per integer
+:param signed: Whether the integers are twos-complement (True) or unsigned (False)
+:param out: Array to store the integers in. int32 for signed integers, uint32 for unsigned.
+"""
+def twos_to_integer(twosBytes, firstByte='msb', bytesPerInteger=3, signed=True, out=None):
+    if bytesPerInteger not in [1, 2, 3, 4]:
+        raise ValueError(f'bytesPerInteger must be between 1 and 4. Got {bytesPerInteger}')
+    if firstByte == 'msb':
+        byteOrder = '>'
+    elif firstByte == 'lsb':
+        byteOrder = '<'
+    else:
+        raise ValueError(f'firstByte {firstByte} not recognized. Available values are "msb" and "lsb"')
 
-        isNegative = (twosBytes[:, 0] & 0b10000000) != 0 # checks the MSB of the twos complement number
-        number -= np.power(2, 8*bytesPerInteger)*isNegative
-    elif(firstByte == 'lsb'):
-        for i in range(bytesPerInteger):
-            number += np.power(256, i) * twosBytes[i]
+    twosBytes = np.asarray(twosBytes)
+    if twosBytes.dtype != np.uint8:
+        twosBytes = twosBytes.astype(np.uint8)
+    twosBytes = twosBytes.reshape(-1, bytesPerInteger)
+    numberIntegers = twosBytes.shape[0]
 
-        isNegative = bool(twosBytes[-1] & 0b10000000)
-        number -= np.power(2, 8*bytesPerInteger)*isNegative
+    if signed:
+        wordType = byteOrder + 'i4'
+        outType = np.int32
+    else:
+        wordType = byteOrder + 'u4'
+        outType = np.uint32
+    if out is None:
+        out = np.empty(numberIntegers, dtype=outType)
 
-    if isinstance(number, np.ndarray):
-        number = number.astype(int)
-    return number
+    if bytesPerInteger == 3:
+        words = np.zeros((numberIntegers, 4), dtype=np.uint8)
+        if firstByte == 'msb':
+            words[:, :3] = twosBytes
+        else:
+            words[:, 1:] = twosBytes
+        np.right_shift(words.view(wordType)[:, 0], 8, out=out)
+    else: # Native widths can be viewed directly
+        integerType = byteOrder + wordType[1] + str(bytesPerInteger)
+        np.copyto(out, np.ascontiguousarray(twosBytes).view(integerType)[:, 0], casting='same_kind')
+    return out
 
 
 """
@@ -32,14 +52,38 @@ Converts the AD7766 count to a differential voltage
 
 :param maxVoltage: The maximum voltage that can be seen at either ADC input (5V for the AD7766)
 :param numberBits: The number of bits the ADC uses.
+:param scale: Factor applied to the voltages, e.g. 1000 to convert to mV
+:param out: Floating-point array to store the voltages in
 """
-def count_to_voltage(data, numberBits=24, maxVoltage=3.3, differential=False):
+def count_to_voltage(data, numberBits=24, maxVoltage=3.3, differential=False, scale=1, out=None):
     # The maximum representable unsigned number is 2^24, but the maximum representable twos complement
     # number is half that, or 2^24 / 2
-    conversionFactor = maxVoltage / (pow(2.0, numberBits-1))
-    return np.multiply(data, conversionFactor)
+    conversionFactor = scale * maxVoltage / (pow(2.0, numberBits-1))
+    return np.multiply(data, conversionFactor, out=out)
+
+"""
+Converts twos-complement ADC bytes directly into scaled voltages, (count * maxVoltage / 2^(bits-1) - offsetVoltage) * scale, in a single pass over a preallocated output. A float32 output holds the intermediate integers in its own memory, so no other full-length array is allocated.
+
+:param offsetVoltage: Zero-point voltage subtracted from every voltage
+:param scale: Factor applied to the voltages, e.g. 1000 to convert to mV
+:param out: float32 or float64 array to store the voltages in
+:param dtype: Data type of the voltages if out is not specified
+"""
+def twos_to_voltage(data, bytesPerInteger=3, maxVoltage=3.3, firstByte='msb', differential=False,
+        offsetVoltage=0, scale=1, out=None, dtype=np.float64):
+    numberIntegers = np.size(data) // bytesPerInteger
+    if out is None:
+        out = np.empty(numberIntegers, dtype=dtype)
 
-def twos_to_voltage(data, bytesPerInteger=3, maxVoltage=3.3, firstByte='msb', differential=False):
-    intermediateData = twos_to_integer(data, firstByte=firstByte, bytesPerInteger=bytesPerInteger)
-    voltages = count_to_voltage(intermediateData, maxVoltage=maxVoltage, differential=differential)
+    if out.dtype == np.float32:
+        integers = out.view(np.int32)
+    else:
+        integers = None
+    intermediateData = twos_to_integer(
+            data, firstByte=firstByte, bytesPerInteger=bytesPerInteger, out=integers)
+    voltages = count_to_voltage(
+            intermediateData, numberBits=8*bytesPerInteger, maxVoltage=maxVoltage,
+            differential=differential, scale=scale, out=out)
+    if offsetVoltage != 0:
+        np.subtract(voltages, offsetVoltage * scale, out=voltages)
     return voltages
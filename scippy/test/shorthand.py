@@ -0,0 +1,82 @@
+"""
+Serial-port-like and VISA-resource-like stand-ins for instruments, for testing drivers without hardware. Pass one as the device of a driver.
+"""
+import pyvisa
+
+class ReplyingDevice:
+    """
+    Minimal serial-like device which records written lines and replies with canned lines
+    """
+    def __init__(self, replies):
+        self.written = []
+        self.replies = list(replies)
+        self.timeout = 1
+
+    def write(self, data):
+        self.written.append(data.decode())
+
+    def readline(self):
+        return (self.replies.pop(0) + '\n').encode()
+
+class StreamingDevice:
+    """
+    Minimal serial-like device which returns a fixed byte stream in chunks of at most chunk_size bytes
+    """
+    def __init__(self, data, chunk_size=7):
+        self.data = bytes(data)
+        self.chunk_size = chunk_size
+        self.timeout = 1
+
+    def readinto(self, buffer):
+        n_bytes = min(len(buffer), len(self.data), self.chunk_size)
+        buffer[:n_bytes] = self.data[:n_bytes]
+        self.data = self.data[n_bytes:]
+        return n_bytes
+
+class BinaryReplyingDevice:
+    """
+    Serial-like device which records written lines and replies with a fixed byte stream
+    """
+    def __init__(self, data):
+        self.written = []
+        self.data = bytes(data)
+        self.timeout = 1
+
+    def write(self, data):
+        self.written.append(data.decode())
+
+    def readinto(self, buffer):
+        n_bytes = min(len(buffer), len(self.data))
+        buffer[:n_bytes] = self.data[:n_bytes]
+        self.data = self.data[n_bytes:]
+        return n_bytes
+
+    def read(self, size=1):
+        data, self.data = self.data[:size], self.data[size:]
+        return data
+
+    def readline(self):
+        line, _, self.data = self.data.partition(b'\n')
+        return line + b'\n'
+
+class VisaStreamingDevice:
+    """
+    Minimal pyvisa-resource-like device which records written lines and returns a fixed byte stream, timing out once it is exhausted
+    """
+    def __init__(self, data):
+        self.written = []
+        self.data = bytes(data)
+        self.timeout = 1000
+        self.n_clears = 0
+
+    def write(self, string):
+        self.written.append(string)
+
+    def read_bytes(self, n_bytes):
+        if len(self.data) == 0:
+            raise pyvisa.errors.VisaIOError(pyvisa.constants.StatusCode.error_timeout)
+        data, self.data = self.data[:n_bytes], self.data[n_bytes:]
+        return data
+
+    def clear(self):
+        self.n_clears += 1
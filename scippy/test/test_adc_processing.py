@@ -40,3 +40,55 @@ def testTwosToVoltage():
     testBytes = np.array([127, 255, 255])
     actualVoltage = twos_to_voltage(testBytes, maxVoltage=5, differential=True)
     assert_allclose(desiredVoltage, actualVoltage, atol=1e-5)
+
+@pytest.mark.remote
+def testTwosToIntegerLSB():
+    testBytes = np.array([255, 255, 127, 1, 0, 0, 0, 0, 128], dtype=np.uint8)
+    desiredIntegers = np.array([8388607, 1, -8388608])
+    actualIntegers = twos_to_integer(testBytes, firstByte='lsb')
+    assert_equal(actualIntegers, desiredIntegers)
+
+@pytest.mark.remote
+def testTwosToIntegerUnsigned():
+    testBytes = np.array([255, 255, 255, 0, 1, 0], dtype=np.uint8)
+    desiredIntegers = np.array([16777215, 256])
+    actualIntegers = twos_to_integer(testBytes, signed=False)
+    assert_equal(actualIntegers, desiredIntegers)
+
+@pytest.mark.remote
+@pytest.mark.parametrize('bytesPerInteger', [1, 2, 3, 4])
+@pytest.mark.parametrize('firstByte', ['msb', 'lsb'])
+def testTwosToIntegerWidths(bytesPerInteger, firstByte):
+    """
+    Compare against a straightforward per-integer conversion for random bytes
+    """
+    rng = np.random.default_rng(0)
+    testBytes = rng.integers(0, 256, size=30*bytesPerInteger, dtype=np.uint8)
+    desiredIntegers = []
+    for integerBytes in testBytes.reshape(-1, bytesPerInteger):
+        desiredIntegers.append(int.from_bytes(
+            bytes(integerBytes), 'big' if firstByte == 'msb' else 'little', signed=True))
+    actualIntegers = twos_to_integer(testBytes, firstByte=firstByte, bytesPerInteger=bytesPerInteger)
+    assert_equal(actualIntegers, desiredIntegers)
+
+@pytest.mark.remote
+def testTwosToIntegerOut():
+    testBytes = np.array([255, 255, 255, 100, 255, 255], dtype=np.uint8)
+    out = np.zeros(2, dtype=np.int32)
+    actualIntegers = twos_to_integer(testBytes, out=out)
+    assert actualIntegers is out
+    assert_equal(out, [-1, 6619135])
+
+@pytest.mark.remote
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+def testTwosToVoltageFused(dtype):
+    """
+    Check that the fused conversion matches the step-by-step conversion, including offset subtraction and scaling to mV
+    """
+    rng = np.random.default_rng(1)
+    testBytes = rng.integers(0, 256, size=300, dtype=np.uint8)
+    desiredVoltages = 1000 * (count_to_voltage(twos_to_integer(testBytes), maxVoltage=3.3) - 1.5)
+    out = np.empty(100, dtype=dtype)
+    actualVoltages = twos_to_voltage(testBytes, maxVoltage=3.3, offsetVoltage=1.5, scale=1000, out=out)
+    assert actualVoltages is out
+    assert_allclose(actualVoltages, desiredVoltages, rtol=1e-6, atol=1e-3)
@@ -139,3 +139,22 @@ def test_verify_incorrect_output(agilent):
         agilent['device'].verify()
 
 
+
+@pytest.mark.agilent
+def test_batch(agilent):
+    with agilent['device'].batch():
+        agilent['device'].frequency = 200*ureg.Hz
+        agilent['device'].amplitude = 0.2*ureg.V
+        agilent['device'].offset_voltage = 0.05*ureg.V
+    agilent['device'].verify()
+
+@pytest.mark.agilent
+def test_batch_discarded_on_error(agilent):
+    with pytest.raises(RuntimeError):
+        with agilent['device'].batch():
+            agilent['device'].frequency = 200*ureg.Hz
+            raise RuntimeError
+    actual_frequency = agilent['device'].frequency
+    desired_frequency = 1000*ureg.Hz
+    assert actual_frequency == desired_frequency
+    agilent['device'].verify()
@@ -0,0 +1,58 @@
+from scippy import AsyncSCPIDevice
+import asyncio
+import time
+import pytest
+from numpy.testing import assert_equal
+
+class SlowDevice:
+    """
+    Device-like object whose queries take a fixed amount of time
+    """
+    def __init__(self, name, delay=0.3):
+        self.name = name
+        self.delay = delay
+        self.closed = False
+
+    def query(self, string):
+        time.sleep(self.delay)
+        return f'{self.name}: {string}'
+
+    @property
+    def temperature(self):
+        time.sleep(self.delay)
+        return 25.0
+
+    def close(self):
+        self.closed = True
+
+@pytest.mark.remote
+def test_concurrent_devices():
+    """
+    Check that queries to different devices overlap rather than running one after the other
+    """
+    async def run_queries():
+        first_device = AsyncSCPIDevice(SlowDevice('first'))
+        second_device = AsyncSCPIDevice(SlowDevice('second'))
+        replies = await asyncio.gather(
+                first_device.query('A?'), second_device.query('B?'),
+                first_device.get('temperature'))
+        await first_device.close()
+        await second_device.close()
+        return replies
+
+    start_time = time.perf_counter()
+    replies = asyncio.run(run_queries())
+    elapsed_time = time.perf_counter() - start_time
+    assert_equal(replies, ['first: A?', 'second: B?', 25.0])
+    assert elapsed_time < 0.8 # Two queries to the same device are serialized, the other device overlaps
+
+@pytest.mark.remote
+def test_context_closes_device():
+    device = SlowDevice('device', delay=0)
+    async def use_device():
+        async with AsyncSCPIDevice(device) as async_device:
+            return await async_device.query('A?')
+
+    reply = asyncio.run(use_device())
+    assert_equal(reply, 'device: A?')
+    assert_equal(device.closed, True)
@@ -0,0 +1,44 @@
+import pytest
+from scippy import Capture, ureg
+from numpy.testing import assert_equal, assert_allclose
+import numpy as np
+import pandas as pd
+
+@pytest.mark.remote
+def test_times():
+    capture = Capture(np.zeros(4), sampling_frequency=10, start_time=1)
+    assert_allclose(capture.times, [1, 1.1, 1.2, 1.3])
+    assert capture.times is capture.times
+
+@pytest.mark.remote
+def test_sync_column():
+    capture = Capture(np.zeros(5), sampling_frequency=10, sync_indices=np.array([1, 3]))
+    assert_equal(capture.sync_column(), [0, 1, 0, 1, 0])
+
+@pytest.mark.remote
+def test_quantity():
+    capture = Capture(np.array([1.0, 2.0]), sampling_frequency=10)
+    assert_equal(capture.quantity.to(ureg.V).m, [0.001, 0.002])
+
+@pytest.mark.remote
+def test_to_dataframe():
+    voltages = np.array([1.0, 2.0, 3.0])
+    capture = Capture(voltages, sampling_frequency=10, sync_indices=np.array([2]))
+    data = capture.to_dataframe()
+    assert_equal(type(data), pd.DataFrame)
+    assert_equal(list(data.columns), ['Time (s)', 'Voltage (mV)', 'Sync'])
+    assert_equal(data['Voltage (mV)'].values, voltages)
+    assert_equal(data['Sync'].values, [0, 0, 1])
+
+@pytest.mark.remote
+def test_to_dataframe_no_sync():
+    capture = Capture(np.zeros(3), sampling_frequency=10)
+    data = capture.to_dataframe()
+    assert_equal(list(data.columns), ['Time (s)', 'Voltage (mV)'])
+
+@pytest.mark.remote
+def test_to_dataframe_gain():
+    capture = Capture(np.array([1.0, 2.0]), sampling_frequency=10)
+    data = capture.to_dataframe(gain=ureg.Quantity(1, ureg.Mohm))
+    assert_equal(data.shape, (2, 2))
+    assert_allclose(data.iloc[:, 1].values, [1.0, 2.0])
@@ -0,0 +1,131 @@
+from scippy.source.discovery_cache import load_discovery_cache, cached_resource, update_discovery_cache, invalidate_discovery_cache
+from scippy import SCPIDevice, ResourceBusyError
+from scippy.source.session_pool import register_session, close_sessions
+import scippy.source.SCPIDevice as scpi_device
+import pytest
+from numpy.testing import assert_equal
+
+@pytest.fixture
+def cache_file(tmp_path):
+    yield str(tmp_path / 'cache' / 'discovery_cache.json')
+
+@pytest.mark.remote
+def test_missing_cache(cache_file):
+    assert_equal(load_discovery_cache(cache_file), {})
+    assert_equal(cached_resource('pyvisa', 'Device', cache_file), None)
+
+@pytest.mark.remote
+def test_update_cache(cache_file):
+    update_discovery_cache('pyvisa', 'Device', 'GPIB0::24::INSTR', cache_file)
+    update_discovery_cache('pyserial', 'Board', '/dev/cu.usbmodem1', cache_file)
+    assert_equal(cached_resource('pyvisa', 'Device', cache_file), 'GPIB0::24::INSTR')
+    assert_equal(cached_resource('pyserial', 'Board', cache_file), '/dev/cu.usbmodem1')
+    assert_equal(cached_resource('pyserial', 'Device', cache_file), None)
+
+@pytest.mark.remote
+def test_invalidate_cache(cache_file):
+    update_discovery_cache('pyvisa', 'Device', 'GPIB0::24::INSTR', cache_file)
+    update_discovery_cache('pyvisa', 'Other', 'USB0::1::INSTR', cache_file)
+    invalidate_discovery_cache('pyvisa', 'Device', cache_file)
+    assert_equal(cached_resource('pyvisa', 'Device', cache_file), None)
+    assert_equal(cached_resource('pyvisa', 'Other', cache_file), 'USB0::1::INSTR')
+
+    invalidate_discovery_cache(filename=cache_file)
+    assert_equal(load_discovery_cache(cache_file), {})
+
+@pytest.mark.remote
+def test_corrupt_cache(cache_file):
+    update_discovery_cache('pyvisa', 'Device', 'GPIB0::24::INSTR', cache_file)
+    with open(cache_file, 'w') as corrupt_file:
+        corrupt_file.write('{not json')
+    assert_equal(load_discovery_cache(cache_file), {})
+
+class FakeDiscovery:
+    """
+    Stands in for device discovery, recording every search and the cache updates
+    """
+    def __init__(self, monkeypatch, cached_name, stale=False, busy=False):
+        self.searches = []
+        self.updates = []
+        self.invalidations = []
+        self.stale = stale
+        self.busy = busy
+        monkeypatch.setattr(scpi_device, 'cached_resource',
+                            lambda lib_type, device_name: cached_name)
+        monkeypatch.setattr(scpi_device, 'update_discovery_cache',
+                            lambda *args: self.updates.append(args))
+        monkeypatch.setattr(scpi_device, 'invalidate_discovery_cache',
+                            lambda *args: self.invalidations.append(args))
+        monkeypatch.setattr(SCPIDevice, '_find_device',
+                            lambda device, **kwargs: self.find_device(device, **kwargs))
+
+    def find_device(self, device, candidates=[], **kwargs):
+        self.searches.append(dict(kwargs, candidates=candidates))
+        if candidates != [] and self.busy:
+            raise ResourceBusyError('Resource in use')
+        if candidates != [] and self.stale:
+            raise RuntimeError('Device not found')
+        device.resource_name = 'USB0::2::INSTR' if candidates == [] else candidates[0]
+        device.device = None
+
+@pytest.mark.remote
+def test_init_cache_hit(monkeypatch):
+    discovery = FakeDiscovery(monkeypatch, 'USB0::1::INSTR')
+    device = SCPIDevice(device_name='Device')
+    assert_equal(device.resource_name, 'USB0::1::INSTR')
+    assert_equal(len(discovery.searches), 1)
+    assert_equal(discovery.searches[0]['candidates'], ['USB0::1::INSTR'])
+    assert_equal(discovery.searches[0]['n_retries'], 0)
+    assert discovery.searches[0]['probe_timeout'] <= SCPIDevice.CACHED_PROBE_TIMEOUT
+    assert_equal(discovery.updates, [])
+
+@pytest.mark.remote
+def test_init_cache_miss(monkeypatch):
+    discovery = FakeDiscovery(monkeypatch, None)
+    device = SCPIDevice(device_name='Device')
+    assert_equal(device.resource_name, 'USB0::2::INSTR')
+    assert_equal(len(discovery.searches), 1)
+    assert_equal(discovery.searches[0]['candidates'], [])
+    assert_equal(discovery.updates, [('pyvisa', 'Device', 'USB0::2::INSTR')])
+
+@pytest.mark.remote
+def test_init_cache_stale(monkeypatch):
+    discovery = FakeDiscovery(monkeypatch, 'USB0::1::INSTR', stale=True)
+    device = SCPIDevice(device_name='Device')
+    assert_equal(device.resource_name, 'USB0::2::INSTR')
+    assert_equal([search['candidates'] for search in discovery.searches],
+                 [['USB0::1::INSTR'], []])
+    assert_equal(discovery.invalidations, [('pyvisa', 'Device')])
+    assert_equal(discovery.updates, [('pyvisa', 'Device', 'USB0::2::INSTR')])
+
+@pytest.mark.remote
+def test_init_cache_busy(monkeypatch):
+    discovery = FakeDiscovery(monkeypatch, 'USB0::1::INSTR', busy=True)
+    with pytest.raises(ResourceBusyError):
+        SCPIDevice(device_name='Device')
+    assert_equal(discovery.invalidations, [])
+    assert_equal(len(discovery.searches), 1)
+
+class PooledDevice:
+    timeout = 2000
+
+    def close(self):
+        pass
+
+@pytest.mark.remote
+def test_cached_candidate_in_use(monkeypatch):
+    invalidations = []
+    monkeypatch.setattr(scpi_device, 'cached_resource',
+                        lambda lib_type, device_name: 'USB0::1::INSTR')
+    monkeypatch.setattr(scpi_device, 'invalidate_discovery_cache',
+                        lambda *args: invalidations.append(args))
+    close_sessions()
+    register_session('USB0::1::INSTR', PooledDevice(), 'Device')
+    try:
+        with pytest.raises(ResourceBusyError):
+            SCPIDevice(device_name='Device')
+        with pytest.raises(ResourceBusyError):
+            SCPIDevice(device_name='Device', use_cache=False, resource_name='USB0::1::INSTR')
+    finally:
+        close_sessions()
+    assert_equal(invalidations, [])
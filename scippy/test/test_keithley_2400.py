@@ -10,6 +10,7 @@ import pytest
 import pint
 import serial
 from numpy.testing import assert_equal, assert_allclose
+from scippy.test.shorthand import ReplyingDevice, BinaryReplyingDevice
 
 @pytest.fixture
 def timeout(keithley):
@@ -218,4 +219,204 @@ def test_current_range_auto(keithley, timeout):
     actual_range = keithley['device'].current_range
     assert_equal_qt(actual_range, desired_range)
 
+@pytest.mark.keithley
+def test_read_state(keithley, timeout):
+    keithley['device'].mode = 'voltage'
+    keithley['device'].voltage = 1*ureg.V
+    keithley['device'].current_compliance = 1*ureg.mA
+    state = keithley['device'].read_state()
+    assert_equal(state['mode'], 'voltage')
+    assert_equal(state['output_on'], False)
+    assert_equal_qt(state['voltage'], 1*ureg.V)
+    assert_equal_qt(state['current_compliance'].to(ureg.mA), 1*ureg.mA)
+    assert_equal_qt(state['voltage_range'], keithley['device'].voltage_range)
+
+@pytest.mark.keithley
+def test_cached_voltage_range(keithley, timeout):
+    keithley['device'].cache_state = True
+    keithley['device'].refresh()
+    keithley['device'].mode = 'voltage'
+    keithley['device'].voltage_range = 2*ureg.V
+    desired_range = 2.1*ureg.V
+    cached_range = keithley['device'].voltage_range
+    keithley['device'].invalidate()
+    actual_range = keithley['device'].voltage_range
+    keithley['device'].cache_state = False
+    assert_equal_qt(cached_range, desired_range)
+    assert_equal_qt(actual_range, desired_range)
+
 # TODO: ADD CHECK FOR COMPLIANCE TRIPPED UNIT TESTS
+
+STATE_REPLY = 'VOLT;+0.000000E+00;+0.000000E+00;+2.100000E+01;+1.050000E-04;+2.100000E+01;+1.050000E-04;0'
+
+def replying_keithley(replies, data_format='ascii'):
+    device = Keithley(lib_type='pyserial', read_termination='\n', write_termination='\n',
+                      device=ReplyingDevice([STATE_REPLY] + list(replies)),
+                      init_strategy='lazy', data_format=data_format)
+    device.mode = 'voltage'
+    device.device.written.clear()
+    return device
+
+@pytest.mark.remote
+def test_sweep_list():
+    levels = np.linspace(0, 1, 150)
+    readings = np.column_stack((levels, levels * 1e-6))
+    device = replying_keithley(['0', ','.join(str(x) for x in readings.ravel())])
+    voltages, currents, at_compliance = device.sweep(levels)
+
+    assert_allclose(voltages, levels)
+    assert_allclose(currents, levels * 1e-6)
+    assert_equal(at_compliance, False)
+    written = ''.join(device.device.written)
+    assert 'source:voltage:mode list' in written
+    assert 'source:list:voltage:append ' in written
+    assert 'trigger:count 150' in written
+    assert_equal(device.device.written[-2], 'read?\n')
+    assert_equal(device.device.written[-1],
+                 'source:voltage:mode fixed;:trigger:count 1;:output:state off\n')
+    assert_equal(device.device.timeout, 1)
+
+@pytest.mark.remote
+def test_sweep_linear_compliance():
+    levels = np.linspace(0, 10, 3)
+    device = replying_keithley(['1', '0,0,5,1e-05,9.91e+37,1.05e-04'])
+    device.elements = ['current']
+    with pytest.warns(UserWarning):
+        voltages, currents, at_compliance = device.sweep(levels, spacing='linear')
+
+    assert_equal(at_compliance, [False, False, True])
+    assert_allclose(voltages, [0, 5, 21])
+    written = ''.join(device.device.written)
+    assert 'source:voltage:start 0.0;:source:voltage:stop 10.0' in written
+    assert 'source:sweep:spacing linear' in written
+    assert device.device.written[-1].endswith(
+        'format:elements current;:output:state on\n')
+    assert_equal(device.elements, ['current'])
+
+@pytest.mark.remote
+def test_sweep_too_long():
+    device = replying_keithley([])
+    with pytest.raises(ValueError):
+        device.sweep(np.zeros(2501))
+
+@pytest.mark.remote
+def test_data_format():
+    device = replying_keithley([])
+    device.data_format = 'sreal'
+    device.elements = ['current', 'voltage']
+    assert_equal(device.device.written, [
+        'format:data sreal\n', 'format:border swapped\n',
+        'format:elements voltage,current\n'])
+    assert_equal(device.elements, ['voltage', 'current'])
+    with pytest.raises(ValueError):
+        device.data_format = 'int'
+
+@pytest.mark.remote
+def test_measure_binary():
+    device = replying_keithley([], data_format='real')
+    device.device = BinaryReplyingDevice(
+            b'#0' + np.array([1.5, 2e-6], dtype='<f8').tobytes() + b'\n')
+    voltage, current = device.measure()
+    assert_equal(device.device.written, ['measure:current?\n'])
+    assert_equal(voltage, 1.5 * ureg.V)
+    assert_equal(current, 2e-6 * ureg.A)
+    assert_equal(device.device.data, b'')
+
+@pytest.mark.remote
+def test_measure_single_element():
+    device = Keithley(lib_type='pyserial', read_termination='\n', write_termination='\n',
+                      device=ReplyingDevice([STATE_REPLY, '+2.000000E-06']),
+                      init_strategy='lazy', elements=['current'])
+    assert 'format:elements current' in device.device.written[0]
+    voltage, current = device.measure()
+    assert np.isnan(voltage.m)
+    assert_equal(current, 2e-6 * ureg.A)
+
+@pytest.mark.remote
+def test_sweep_binary_compliance():
+    readings = np.array([0, 0, 5, 1e-5, 9.91e37, 1.05e-4], dtype='<f4')
+    device = replying_keithley([], data_format='sreal')
+    device.device = BinaryReplyingDevice(b'0\n#0' + readings.tobytes() + b'\n')
+    with pytest.warns(UserWarning):
+        voltages, currents, at_compliance = device.sweep(np.linspace(0, 10, 3))
+    assert_equal(at_compliance, [False, False, True])
+    assert_allclose(voltages, [0, 5, 21])
+    assert_allclose(currents, [0, 1e-5, 1.05e-4])
+
+@pytest.mark.remote
+def test_init_lazy():
+    device = Keithley(lib_type='pyserial', read_termination='\n', write_termination='\n',
+                      device=ReplyingDevice([STATE_REPLY]), init_strategy='lazy')
+    written = device.device.written
+    assert 'format:elements voltage,current' in written[0]
+    assert 'source:function?' in ''.join(written[:-1])
+    assert_equal(written[-1], 'source:function current\n')
+    assert_equal(device.mode, 'current')
+    assert_equal(device._state, {})
+
+@pytest.mark.remote
+def test_init_lazy_unchanged():
+    state_reply = STATE_REPLY.replace('VOLT', 'CURR')
+    device = Keithley(lib_type='pyserial', read_termination='\n', write_termination='\n',
+                      device=ReplyingDevice([state_reply]), init_strategy='lazy', cache_state=True)
+    assert 'source:function current' not in ''.join(device.device.written)
+    assert_equal(device.voltage_compliance, 21 * ureg.V)
+
+@pytest.mark.remote
+def test_apply_state():
+    device = Keithley(lib_type='pyserial', read_termination='\n', write_termination='\n',
+                      device=ReplyingDevice([STATE_REPLY.replace('VOLT', 'CURR')] * 2), init_strategy='lazy')
+    device.device.written.clear()
+    device.apply_state({'voltage': 1 * ureg.V, 'current_compliance': 105e-6, 'output_on': True})
+    assert_equal(device.device.written[-1], 'source:voltage:level 1;:output:state 1\n')
+
+@pytest.mark.remote
+def test_batch_error_restores_driver():
+    device = Keithley(lib_type='pyserial', read_termination='\n', write_termination='\n',
+                      device=ReplyingDevice([STATE_REPLY]), init_strategy='lazy')
+    n_written = len(device.device.written)
+    with pytest.raises(RuntimeError):
+        with device.batch():
+            device.mode = 'voltage'
+            raise RuntimeError
+    assert_equal(len(device.device.written), n_written)
+    assert_equal(device.mode, 'current')
+
+@pytest.mark.remote
+def test_measure_invalidates_output():
+    device = Keithley(lib_type='pyserial', read_termination='\n', write_termination='\n',
+                      device=ReplyingDevice([STATE_REPLY, '1.5,2e-06']),
+                      init_strategy='lazy', cache_state=True)
+    assert_equal(device.output_on, False)
+    device.measure()
+    device.output_on = False
+    assert_equal(device.device.written[-1], 'output:state off\n')
+
+@pytest.mark.remote
+def test_init_recall():
+    device = Keithley(lib_type='pyserial', read_termination='\n', write_termination='\n',
+                      device=ReplyingDevice([STATE_REPLY]), init_strategy='recall', setup=2,
+                      data_format='sreal')
+    assert device.device.written[0].startswith(
+        '*RCL 2;:format:data sreal;:format:border swapped;:format:elements voltage,current')
+    assert_equal(device.mode, 'voltage')
+    with pytest.raises(ValueError):
+        device.save_setup(5)
+    device.save_setup(1)
+    assert_equal(device.device.written[-1], '*SAV 1\n')
+
+@pytest.mark.remote
+def test_set_speed():
+    device = Keithley(lib_type='pyserial', read_termination='\n', write_termination='\n',
+                      device=ReplyingDevice([STATE_REPLY]), init_strategy='lazy', speed='fast')
+    message = device.device.written[-1]
+    assert message.startswith('sense:current:nplcycles 0.01;:sense:voltage:nplcycles 0.01;:system:azero off')
+    assert 'display:enable off' in ''.join(device.device.written)
+    assert_equal(device.speed['nplc'], 0.01)
+    assert device.readings_per_second() > 100
+
+    device.set_speed('hi_accuracy', display=False)
+    written = ''.join(device.device.written[-2:])
+    assert 'sense:average:count 10' in written
+    assert 'source:delay:auto on' in written
+    assert 'display:enable off' in written
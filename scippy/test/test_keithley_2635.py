@@ -11,6 +11,7 @@ import pytest
 import pint
 import serial
 from numpy.testing import assert_equal, assert_allclose
+from scippy.test.shorthand import ReplyingDevice
 
 @pytest.fixture
 def timeout(keithley):
@@ -223,3 +224,59 @@ def test_current_range_auto(keithley, timeout):
     assert_equal_qt(actual_range, desired_range)
 
 # TODO: ADD CHECK FOR COMPLIANCE TRIPPED UNIT TESTS
+
+@pytest.mark.remote
+def test_set_speed():
+    device = Keithley(lib_type='pyserial', device=ReplyingDevice([]), speed='fast')
+    written = ''.join(device.device.written)
+    assert 'smua.measure.nplc = 0.01 smua.measure.autozero = smua.AUTOZERO_OFF' in written
+    assert 'smua.measure.filter.enable = smua.FILTER_OFF' in written
+    assert 'smua.measure.autorangei = smua.AUTORANGE_OFF' in written
+    fast_rate = device.readings_per_second()
+    device.set_speed('normal')
+    assert fast_rate > device.readings_per_second()
+    assert 'smua.source.delay = smua.DELAY_AUTO' in device.device.written[-1]
+
+@pytest.mark.remote
+def test_sweep():
+    device = Keithley(lib_type='pyserial', device=ReplyingDevice([
+        '1.00000e+05', 'false', '0.000000e+00',
+        '1.0e-06, 1.0e-01, 2.0e-06, 2.0e-01, 3.0e-06, 3.0e-01']))
+    voltages, currents = device.sweep([0.1, 0.2, 0.3])
+    assert_allclose(voltages, [0.1, 0.2, 0.3])
+    assert_allclose(currents, [1e-6, 2e-6, 3e-6])
+    written = device.device.written
+    load_index = [line.startswith('loadscript') for line in written].index(True)
+    assert written[load_index + 1].startswith('scippy_levels = {}')
+    assert 'endscript\n' in written
+    limit, levels = written[-3][len('smua.source.limiti = '):].split(' ', 1)
+    assert_allclose(float(limit), 105e-6)
+    assert levels.startswith('scippy_levels = {}')
+    assert written[-3].endswith('_append({0.1,0.2,0.3})\n')
+    assert written[-2].endswith('(true)\n')
+    assert_equal(written[-1], 'smua.source.output = 0\n')
+    assert_equal(device.device.timeout, 1)
+
+@pytest.mark.remote
+def test_sweep_reuses_script():
+    device = Keithley(lib_type='pyserial', device=ReplyingDevice([
+        '1.00000e+05', 'true', '1.000000e+00', '1.0e-06, 1.0e-01',
+        '1.000000e+00', '2.0e-06, 2.0e-01']))
+    device.sweep([0.1], mode='current')
+    device.sweep([0.2], mode='current')
+    written = ''.join(device.device.written)
+    assert 'loadscript' not in written
+    assert written.count('~= nil') == 1
+    assert written.count('capacity') == 1
+    assert 'smua.source.limitv = 21' in device.device.written[-3]
+    assert device.device.written[-2].endswith('(false)\n')
+    assert_equal(device.device.written[-1], 'smua.source.output = 1\n')
+    with pytest.raises(ValueError):
+        device.sweep([0.1], mode='resistance')
+
+@pytest.mark.remote
+def test_sweep_too_long():
+    device = Keithley(lib_type='pyserial', device=ReplyingDevice(['2.00000e+00']))
+    with pytest.raises(ValueError):
+        device.sweep([0.1, 0.2, 0.3])
+    assert_equal(device.device.written, ['print(smua.nvbuffer1.capacity)\n'])
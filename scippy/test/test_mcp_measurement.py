@@ -45,7 +45,6 @@ def test_measure_byte_count(mcp):
         actualBytes = len(data)
         assert_equal(actualBytes, desiredBytes)
 
-@pytest.mark.skip
 @pytest.mark.mcp
 def test_measure_large_byte_count(mcp):
     """
@@ -55,9 +54,11 @@ def test_measure_large_byte_count(mcp):
     desiredMeasurements = 500000
     desiredBytes = desiredMeasurements * 3
     mcp['device'].n_samples = desiredMeasurements
-    data = mcp['device'].measure() # If this isn't blocking, it should probably be made blocking.
+    progress = []
+    data = mcp['device'].measure(progress=lambda n_read, n_samples: progress.append(n_read))
     actualBytes = len(data)
     assert_equal(actualBytes, desiredBytes)
+    assert_equal(progress[-1], desiredMeasurements)
 
 @pytest.mark.mcp
 def test_synchronization_points(mcp, agilent):
@@ -137,3 +138,51 @@ def test_generate_data_long(mcp):
     assert_equal(type(data), pd.DataFrame)
     same_names = (data.columns.values == ['Time (s)', 'Voltage (mV)', 'Sync'])
     assert_equal(all(same_names), True)
+
+@pytest.mark.mcp
+def test_generate_data_capture(mcp):
+    n_samples = 1111
+    mcp['device'].n_samples = n_samples
+    capture = mcp['device'].generate_data(as_dataframe=False)
+
+    assert_equal(len(capture.voltages), n_samples)
+    assert_equal(len(capture.times), n_samples)
+    assert np.all(capture.sync_indices < n_samples)
+
+@pytest.mark.mcp
+def test_stream(mcp):
+    chunk_samples = 1000
+    total_samples = 3500
+    chunks = list(mcp['device'].stream(chunk_samples, total_samples=total_samples))
+
+    actual_offsets = [chunk[0] for chunk in chunks]
+    actual_lengths = [len(chunk[1]) for chunk in chunks]
+    assert_equal(actual_offsets, [0, 1000, 2000, 3000])
+    assert_equal(actual_lengths, [1000, 1000, 1000, 500])
+    for sample_offset, voltages, sync_indices, contiguous in chunks:
+        assert not contiguous
+        assert np.all(sync_indices >= sample_offset)
+        assert np.all(sync_indices < sample_offset + len(voltages))
+    assert_equal(mcp['device'].n_samples, 1)
+
+@pytest.mark.mcp
+def test_stream_unbounded(mcp):
+    stream = mcp['device'].stream(100, sync=False)
+    first_offset, first_voltages, first_sync, _ = next(stream)
+    second_offset, second_voltages, second_sync, _ = next(stream)
+    stream.close()
+    assert_equal((first_offset, second_offset), (0, 100))
+    assert_equal(first_sync, None)
+    assert_equal(mcp['device'].n_samples, 1)
+
+@pytest.mark.mcp
+def test_background_acquisition(mcp):
+    mcp['device'].start_acquisition(10000, chunk_samples=500)
+    first_offset, first_voltages, _ = mcp['device'].next_samples(1000, timeout=5)
+    second_offset, second_voltages, _ = mcp['device'].next_samples(1000, timeout=5)
+    latest_offset, latest_voltages, _ = mcp['device'].latest_samples(200)
+    mcp['device'].stop_acquisition()
+
+    assert_equal(len(first_voltages), 1000)
+    assert second_offset >= first_offset + 1000
+    assert_equal(len(latest_voltages), 200)
@@ -0,0 +1,132 @@
+import pytest
+from scippy import MCP, MCPSimulator, twos_to_integer
+from scippy.test.shorthand import VisaStreamingDevice
+from numpy.testing import assert_equal
+import numpy as np
+import threading
+import time
+
+@pytest.fixture
+def simulator():
+    return MCPSimulator(sync_frequency=105)
+
+@pytest.fixture
+def mcp(simulator):
+    device = MCP(device=simulator)
+    yield {'device': device, 'simulator': simulator}
+    device.close()
+
+@pytest.mark.remote
+def test_identify(mcp):
+    assert_equal(mcp['device'].identify(), 'MCP3561 Dev Board v1')
+
+@pytest.mark.remote
+def test_measure(mcp):
+    mcp['device'].n_samples = 1000
+    data = mcp['device'].measure()
+    assert_equal(len(data), 3000)
+    assert_equal(np.unique(twos_to_integer(data)), [-100000, 100000])
+
+@pytest.mark.remote
+def test_measure_sync(mcp):
+    mcp['device'].n_samples = 1000
+    measured_bytes, sync_bytes = mcp['device'].measure_sync()
+    sync_indices = twos_to_integer(sync_bytes)
+
+    assert_equal(len(measured_bytes), 3000)
+    assert_equal(mcp['simulator'].commands[-1], 'MEASURE:SYNC?')
+    assert_equal(len(sync_indices), 11)
+    assert_equal(twos_to_integer(measured_bytes)[sync_indices], 100000)
+    assert_equal(twos_to_integer(measured_bytes)[sync_indices - 1], -100000)
+
+@pytest.mark.remote
+def test_generate_data_combined_sync():
+    separate_device = MCP(device=MCPSimulator())
+    combined_device = MCP(device=MCPSimulator(), combined_sync=True)
+    separate_device.n_samples = 2000
+    combined_device.n_samples = 2000
+    separate_data = separate_device.generate_data()
+    combined_data = combined_device.generate_data()
+
+    assert_equal(combined_device.device.commands, ['CONFIGURE 2000', 'MEASURE:SYNC?'])
+    assert_equal(combined_data['Sync'].values, separate_data['Sync'].values)
+    assert_equal(combined_data['Voltage (mV)'].values, separate_data['Voltage (mV)'].values)
+
+@pytest.mark.remote
+def test_generate_data_no_sync(mcp):
+    mcp['device'].n_samples = 100
+    data = mcp['device'].generate_data(sync=False)
+    assert_equal(list(data.columns), ['Time (s)', 'Voltage (mV)'])
+    assert_equal(mcp['simulator'].commands, ['CONFIGURE 100', 'MEASURE?'])
+
+@pytest.mark.remote
+def test_stream_combined_sync():
+    device = MCP(device=MCPSimulator(), combined_sync=True)
+    chunks = list(device.stream(1000, total_samples=3000))
+    sync_indices = np.concatenate([chunk[2] for chunk in chunks])
+    assert_equal(np.diff(sync_indices) >= 93, True)
+    assert_equal(len(sync_indices), 33)
+
+@pytest.mark.remote
+def test_sweep_wavelengths(mcp):
+    mcp['device'].n_samples = 500
+    start_wavelength = mcp['device'].wavelength.m
+    wavelengths = start_wavelength + np.arange(5)
+    main_thread = threading.current_thread()
+    def process(capture):
+        assert threading.current_thread() is not main_thread
+        return len(capture.voltages)
+
+    results = mcp['device'].sweep_wavelengths(wavelengths, process=process)
+    assert_equal(results, [500] * 5)
+    assert_equal(mcp['device'].wavelength.m, start_wavelength + 4)
+    assert mcp['simulator'].motor_position > 0
+
+@pytest.mark.remote
+def test_sweep_wavelengths_error(mcp):
+    def process(capture):
+        raise RuntimeError('Processing failed')
+    with pytest.raises(RuntimeError):
+        mcp['device'].sweep_wavelengths([850, 851], process=process)
+
+@pytest.mark.remote
+def test_rotate_motor_future(mcp):
+    start_time = time.perf_counter()
+    future = mcp['device'].rotate_motor(100, wait=False)
+    assert not future.done()
+    future.result(timeout=1)
+    elapsed_time = time.perf_counter() - start_time
+    assert elapsed_time >= 0.1
+    assert_equal(mcp['simulator'].commands.count('MOTOR:ROTATE?'), 1)
+
+@pytest.mark.remote
+def test_rotate_motor_wait(mcp):
+    mcp['device'].motor_period = 1
+    future = mcp['device'].rotate_motor(-50)
+    assert future.done()
+    assert_equal(mcp['simulator'].motor_position, -50)
+    assert_equal(mcp['device'].motor_rotating, False)
+
+@pytest.mark.remote
+def test_motor_period_kept_locally():
+    device = MCP(device=MCPSimulator())
+    device.rotate_motor(10)
+    device.rotate_motor(10)
+    assert_equal(device.device.commands.count('MOTOR:PERIOD?'), 1)
+    assert_equal(device.device.commands.count('MOTOR:ROTATE?'), 2)
+    device.motor_period = 1
+    device.rotate_motor(10)
+    assert_equal(device.device.commands.count('MOTOR:PERIOD?'), 1)
+    device.reset()
+    assert_equal(device.motor_period, 2)
+    assert_equal(device.device.commands.count('MOTOR:PERIOD?'), 2)
+
+@pytest.mark.remote
+def test_measure_short_clears_visa_input():
+    device = MCP(lib_type='pyvisa', device=VisaStreamingDevice(b'#' + bytes(6)))
+    device.TIMEOUT_MARGIN = 0.01
+    device.n_samples = 3
+    with pytest.warns(UserWarning):
+        measured_bytes = device.measure()
+    assert_equal(len(measured_bytes), 6)
+    assert_equal(device.device.n_clears, 1)
@@ -0,0 +1,55 @@
+import pytest
+from scippy import WelchPSD, MCP, MCPSimulator
+from numpy.testing import assert_equal, assert_allclose
+from scipy.signal import welch
+import numpy as np
+
+@pytest.fixture
+def samples():
+    rng = np.random.default_rng(0)
+    times = np.arange(10000) / 1000
+    return np.sin(2 * np.pi * 50 * times) + 0.1 * rng.standard_normal(len(times)) + 3
+
+@pytest.mark.remote
+def test_welch_psd(samples):
+    desired_frequencies, desired_psd = welch(samples, fs=1000, nperseg=256)
+    estimator = WelchPSD(1000, n_per_segment=256)
+    estimator.update(samples)
+    assert_allclose(estimator.frequencies, desired_frequencies)
+    assert_allclose(estimator.psd, desired_psd)
+
+@pytest.mark.remote
+def test_welch_psd_chunks(samples):
+    desired_frequencies, desired_psd = welch(samples, fs=1000, nperseg=200, noverlap=50)
+    estimator = WelchPSD(1000, n_per_segment=200, n_overlap=50)
+    for start_index in range(0, len(samples), 333):
+        estimator.update(samples[start_index:start_index + 333])
+    assert_equal(estimator.n_segments, 66)
+    assert_allclose(estimator.psd, desired_psd)
+
+@pytest.mark.remote
+def test_welch_psd_window_array(samples):
+    desired_frequencies, desired_psd = welch(samples, fs=1000, window='boxcar', nperseg=255)
+    estimator = WelchPSD(1000, n_per_segment=255, window=np.ones(255))
+    estimator.update(samples)
+    assert_allclose(estimator.psd, desired_psd, atol=1e-20)
+
+@pytest.mark.remote
+def test_welch_psd_empty():
+    estimator = WelchPSD(1000, n_per_segment=256)
+    assert_equal(estimator.update(np.zeros(100)), 0)
+    assert np.all(np.isnan(estimator.psd))
+
+@pytest.mark.remote
+def test_welch_psd_bad_overlap():
+    with pytest.raises(ValueError):
+        WelchPSD(1000, n_per_segment=256, n_overlap=256)
+
+@pytest.mark.remote
+def test_welch_psd_stream():
+    device = MCP(device=MCPSimulator())
+    estimator = WelchPSD(device.sampling_frequency, n_per_segment=1024)
+    for _, voltages, _, contiguous in device.stream(3000, total_samples=30000, sync=False):
+        estimator.update(voltages, contiguous)
+    peak_frequency = estimator.frequencies[np.argmax(estimator.psd)]
+    assert_allclose(peak_frequency, 105, atol=device.sampling_frequency / 1024)
@@ -0,0 +1,115 @@
+import pytest
+from scippy import LockInAmplifier, BoxcarAverager, lock_in, MCP, MCPSimulator
+from numpy.testing import assert_equal, assert_allclose
+import numpy as np
+
+def reference_signal(period_lengths, amplitude=2, theta=0.3, harmonic=1, offset=0.5):
+    """
+    Sinusoid locked to a reference with the given period lengths
+    """
+    sync_indices = np.concatenate(([0], np.cumsum(period_lengths)))
+    phases = np.concatenate([np.arange(n) / n for n in period_lengths])
+    voltages = offset + amplitude * np.cos(2 * np.pi * harmonic * phases - theta)
+    return voltages, sync_indices[:-1]
+
+@pytest.mark.remote
+def test_lock_in():
+    voltages, sync_indices = reference_signal([100, 98, 103, 100])
+    in_phase, quadrature = lock_in(voltages, sync_indices)
+    assert_allclose(in_phase, 2 * np.cos(0.3) * np.ones(3), atol=1e-12)
+    assert_allclose(quadrature, 2 * np.sin(0.3) * np.ones(3), atol=1e-12)
+
+@pytest.mark.remote
+def test_lock_in_harmonic():
+    voltages, sync_indices = reference_signal([100, 100, 100], harmonic=2)
+    in_phase, quadrature = lock_in(voltages, sync_indices, harmonic=1)
+    assert_allclose(in_phase, 0, atol=1e-12)
+    in_phase, quadrature = lock_in(voltages, sync_indices, harmonic=2)
+    assert_allclose(in_phase, 2 * np.cos(0.3), atol=1e-12)
+
+@pytest.mark.remote
+def test_lock_in_no_periods():
+    in_phase, quadrature = lock_in(np.ones(10), [3])
+    assert_equal(len(in_phase), 0)
+
+@pytest.mark.remote
+def test_lock_in_amplifier_chunks():
+    voltages, sync_indices = reference_signal([100, 98, 103, 100, 97, 101])
+    desired_in_phase, desired_quadrature = lock_in(voltages, sync_indices)
+
+    lock_in_amplifier = LockInAmplifier()
+    in_phase, quadrature = [], []
+    for start_index in range(0, len(voltages), 77):
+        chunk_sync = sync_indices[(sync_indices >= start_index) & (sync_indices < start_index + 77)]
+        chunk_in_phase, chunk_quadrature = lock_in_amplifier.update(
+                voltages[start_index:start_index + 77], chunk_sync, sample_offset=start_index)
+        in_phase.append(chunk_in_phase)
+        quadrature.append(chunk_quadrature)
+    assert_allclose(np.concatenate(in_phase), desired_in_phase)
+    assert_allclose(np.concatenate(quadrature), desired_quadrature)
+
+@pytest.mark.remote
+def test_lock_in_amplifier_gap():
+    voltages, sync_indices = reference_signal([100, 100, 100, 100])
+    lock_in_amplifier = LockInAmplifier()
+    lock_in_amplifier.update(voltages[:150], [0, 100], sample_offset=0)
+    in_phase, _ = lock_in_amplifier.update(voltages[250:], [300], sample_offset=250)
+    assert_equal(len(in_phase), 0)
+
+@pytest.mark.remote
+def test_lock_in_amplifier_not_contiguous():
+    voltages, sync_indices = reference_signal([100, 100, 100])
+    lock_in_amplifier = LockInAmplifier()
+    lock_in_amplifier.update(voltages[:150], [0, 100], sample_offset=0)
+    in_phase, _ = lock_in_amplifier.update(
+            voltages[150:], [200], sample_offset=150, contiguous=False)
+    assert_equal(len(in_phase), 0)
+
+@pytest.mark.remote
+def test_lock_in_amplifier_stream():
+    device = MCP(device=MCPSimulator(amplitude_counts=100000))
+    lock_in_amplifier = LockInAmplifier()
+    in_phase = [lock_in_amplifier.update(voltages, sync_indices, sample_offset, contiguous)[0]
+                for sample_offset, voltages, sync_indices, contiguous in device.stream(500, total_samples=5000)]
+    in_phase = np.concatenate(in_phase)
+    assert_equal(len(in_phase), 44) # Periods spanning two captures are discarded
+    assert np.all(in_phase > 0)
+
+@pytest.mark.remote
+def test_boxcar_average():
+    voltages, sync_indices = reference_signal([100, 100, 100, 100], theta=0)
+    boxcar = BoxcarAverager(n_bins=4)
+    n_periods = boxcar.update(voltages, sync_indices)
+    desired_average = 0.5 + 2 * np.mean(
+        np.cos(2 * np.pi * np.arange(100).reshape(4, 25) / 100), axis=1)
+    assert_equal(n_periods, 3)
+    assert_allclose(boxcar.average, desired_average)
+    assert_allclose(boxcar.phases, [0.125, 0.375, 0.625, 0.875])
+
+@pytest.mark.remote
+def test_boxcar_chunks():
+    voltages, sync_indices = reference_signal([100, 98, 103, 100, 97, 101])
+    whole_boxcar = BoxcarAverager(n_bins=10)
+    whole_boxcar.update(voltages, sync_indices)
+
+    chunked_boxcar = BoxcarAverager(n_bins=10)
+    for start_index in range(0, len(voltages), 77):
+        chunk_sync = sync_indices[(sync_indices >= start_index) & (sync_indices < start_index + 77)]
+        chunked_boxcar.update(
+                voltages[start_index:start_index + 77], chunk_sync, sample_offset=start_index)
+    assert_equal(chunked_boxcar.n_periods, 5)
+    assert_allclose(chunked_boxcar.average, whole_boxcar.average)
+
+@pytest.mark.remote
+def test_boxcar_dataframe():
+    device = MCP(device=MCPSimulator(amplitude_counts=100000))
+    device.n_samples = 1000
+    boxcar = BoxcarAverager(n_bins=2)
+    for _ in range(3):
+        boxcar.update_dataframe(device.generate_data())
+    assert_equal(boxcar.n_periods, 30)
+    assert boxcar.average[0] > boxcar.average[1]
+
+    boxcar.clear()
+    assert_equal(boxcar.n_periods, 0)
+    assert np.all(np.isnan(boxcar.average))
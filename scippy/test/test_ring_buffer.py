@@ -0,0 +1,81 @@
+from scippy import RingBuffer
+import threading
+import numpy as np
+import pytest
+from numpy.testing import assert_equal
+
+@pytest.mark.remote
+def test_write_read():
+    buffer = RingBuffer(10)
+    buffer.write(np.arange(4))
+    assert_equal(buffer.n_written, 4)
+    assert_equal(buffer.read(1, 3), [1, 2, 3])
+    with pytest.raises(ValueError):
+        buffer.read(2, 3)
+
+@pytest.mark.remote
+def test_wraparound():
+    buffer = RingBuffer(5, dtype=np.int64)
+    buffer.write(np.arange(4))
+    buffer.write(np.arange(4, 8))
+    assert_equal(buffer.first_available, 3)
+    assert_equal(buffer.read(3, 5), [3, 4, 5, 6, 7])
+    with pytest.raises(ValueError):
+        buffer.read(2, 2) # Overwritten
+
+    start_index, samples = buffer.latest(3)
+    assert_equal(start_index, 5)
+    assert_equal(samples, [5, 6, 7])
+
+@pytest.mark.remote
+def test_write_larger_than_capacity():
+    buffer = RingBuffer(4, dtype=np.int64)
+    buffer.write(np.arange(10))
+    assert_equal(buffer.n_written, 10)
+    start_index, samples = buffer.latest(10)
+    assert_equal(start_index, 6)
+    assert_equal(samples, [6, 7, 8, 9])
+
+@pytest.mark.remote
+def test_wait_for():
+    buffer = RingBuffer(100)
+    assert_equal(buffer.wait_for(5, timeout=0.01), False)
+
+    writer = threading.Timer(0.05, buffer.write, args=(np.ones(5),))
+    writer.start()
+    assert_equal(buffer.wait_for(5, timeout=2), True)
+    writer.join()
+
+    closer = threading.Timer(0.05, buffer.close)
+    closer.start()
+    assert_equal(buffer.wait_for(10), False)
+    closer.join()
+
+@pytest.mark.remote
+def test_concurrent_reader():
+    """
+    Check that a reader running alongside the writer only ever sees consistent, contiguous data
+    """
+    buffer = RingBuffer(64, dtype=np.int64)
+    n_chunks = 2000
+    def write_chunks():
+        for i in range(n_chunks):
+            buffer.write(np.arange(i*16, (i+1)*16))
+        buffer.close()
+    writer = threading.Thread(target=write_chunks)
+    writer.start()
+    while writer.is_alive():
+        start_index, samples = buffer.latest(32)
+        assert_equal(samples, np.arange(start_index, start_index + len(samples)))
+    writer.join()
+
+@pytest.mark.remote
+def test_searchsorted():
+    buffer = RingBuffer(5, dtype=np.int64)
+    assert_equal(buffer.searchsorted(3), 0)
+    buffer.write(np.arange(0, 14, 2)) # Wraps around, holding 4 to 12
+    assert_equal(buffer.searchsorted(0), 2)
+    assert_equal(buffer.searchsorted(7), 4)
+    assert_equal(buffer.searchsorted(10), 5)
+    assert_equal(buffer.searchsorted(13), 7)
+    assert_equal(buffer.read(4, 2), [8, 10])
@@ -1,7 +1,10 @@
 from scippy import SCPIDevice
+from scippy.source.SCPIDevice import probe_resources
+from scippy.test.shorthand import ReplyingDevice, StreamingDevice, VisaStreamingDevice
 import numpy as np
 import pyvisa
 import pytest
+import time
 from numpy.testing import assert_equal, assert_allclose
 
 @pytest.fixture
@@ -33,3 +36,233 @@ def test_identify(agilent):
 @pytest.mark.agilent
 def test_read_termination(agilent):
     desired_termination = '\n'
+
+class ProbedDevice:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+@pytest.mark.remote
+def test_probe_resources_first_match():
+    """
+    Check that the first matching resource is returned without waiting for a slow resource, and that non-matching devices are closed
+    """
+    devices = {name: ProbedDevice() for name in ['slow', 'wrong', 'right']}
+    names = {'slow': 'Right Device', 'wrong': 'Wrong Device', 'right': 'Right Device'}
+    def probe(rname):
+        if rname == 'slow':
+            time.sleep(1)
+        return devices[rname], names[rname]
+
+    start_time = time.perf_counter()
+    matches = probe_resources(
+            ['slow', 'wrong', 'right'], probe, device_name='Right Device')
+    elapsed_time = time.perf_counter() - start_time
+    assert elapsed_time < 0.5
+    assert_equal(matches, [('right', devices['right'], 'Right Device')])
+    assert_equal(devices['right'].closed, False)
+    assert_equal(devices['wrong'].closed, True)
+
+    time.sleep(1.2) # Cancelled probe should close its device once it returns
+    assert_equal(devices['slow'].closed, True)
+
+@pytest.mark.remote
+def test_probe_resources_find_all():
+    def probe(rname):
+        if rname == 'silent':
+            return None
+        return ProbedDevice(), 'Device ' + rname
+
+    matches = probe_resources(['a', 'silent', 'b'], probe, find_all=True)
+    actual_names = sorted([match[0] for match in matches])
+    assert_equal(actual_names, ['a', 'b'])
+
+@pytest.mark.remote
+def test_probe_resources_timeout():
+    def probe(rname):
+        time.sleep(1)
+        return ProbedDevice(), 'Device'
+
+    matches = probe_resources(['a', 'b'], probe, timeout=0.1)
+    assert_equal(matches, [])
+
+@pytest.mark.remote
+def test_join_commands():
+    device = SCPIDevice.__new__(SCPIDevice)
+    commands = ['source:function voltage', '*CLS', 'source:voltage:level 1']
+    desired_messages = ['source:function voltage;*CLS;:source:voltage:level 1']
+    actual_messages = device.join_commands(commands)
+    assert_equal(actual_messages, desired_messages)
+
+@pytest.mark.remote
+def test_join_commands_max_length():
+    device = SCPIDevice.__new__(SCPIDevice)
+    device.MAX_MESSAGE_LENGTH = 10
+    commands = ['abcd', 'efgh', 'ijkl']
+    desired_messages = ['abcd;:efgh', 'ijkl']
+    actual_messages = device.join_commands(commands)
+    assert_equal(actual_messages, desired_messages)
+
+@pytest.mark.remote
+def test_query_many_compound():
+    device = SCPIDevice(lib_type='pyserial', device=ReplyingDevice(['+1.0E+03;1;+2.5E-01']))
+    actual_replies = device.query_many(
+            ['FREQUENCY?', 'OUTPUT?', 'VOLTAGE?'], parsers=[float, bool, float])
+    assert_equal(device.device.written, ['FREQUENCY?;:OUTPUT?;:VOLTAGE?\n'])
+    assert_equal(actual_replies, (1000.0, True, 0.25))
+
+@pytest.mark.remote
+def test_query_many_dict():
+    device = SCPIDevice(lib_type='pyserial', device=ReplyingDevice(['5;OFF']))
+    actual_replies = device.query_many(
+            {'count': 'COUNT?', 'enabled': 'ENABLED?'},
+            parsers={'count': int, 'enabled': bool})
+    assert_equal(actual_replies, {'count': 5, 'enabled': False})
+
+@pytest.mark.remote
+def test_query_many_separate():
+    device = SCPIDevice(lib_type='pyserial', device=ReplyingDevice(['12', '0']))
+    device.SUPPORTS_COMPOUND_COMMANDS = False
+    actual_replies = device.query_many(['MOTOR:POSITION?', 'MOTOR:ROTATE?'], parsers=[int, bool])
+    assert_equal(device.device.written, ['MOTOR:POSITION?\n', 'MOTOR:ROTATE?\n'])
+    assert_equal(actual_replies, (12, False))
+
+class OrderedReplyingDevice(ReplyingDevice):
+    """
+    Replying device which records the number of lines written before each read
+    """
+    def __init__(self, replies):
+        super().__init__(replies)
+        self.written_before_read = []
+
+    def readline(self):
+        self.written_before_read.append(len(self.written))
+        return super().readline()
+
+@pytest.mark.remote
+def test_query_many_split():
+    device = SCPIDevice(lib_type='pyserial', device=OrderedReplyingDevice(['1;2', '3']))
+    device.MAX_MESSAGE_LENGTH = 20
+    actual_replies = device.query_many(['FREQUENCY?', 'OUTPUT?', 'VOLTAGE?'], parsers=float)
+    assert_equal(device.device.written, ['FREQUENCY?;:OUTPUT?\n', 'VOLTAGE?\n'])
+    assert_equal(device.device.written_before_read, [1, 2])
+    assert_equal(actual_replies, (1.0, 2.0, 3.0))
+
+@pytest.mark.remote
+def test_query_many_invalid():
+    device = SCPIDevice(lib_type='pyserial', device=ReplyingDevice([]))
+    with pytest.raises(ValueError):
+        device.query_many([])
+    with pytest.raises(ValueError):
+        device.query_many(['VOLTAGE?'], parsers={'voltage': float})
+    assert_equal(device.join_commands([]), [])
+    assert_equal(device.device.written, [])
+
+@pytest.mark.remote
+def test_query_many_in_batch():
+    device = SCPIDevice(lib_type='pyserial', device=ReplyingDevice(['+1.0E+03']))
+    with device.batch():
+        device.write_line('FREQUENCY 1000')
+        actual_replies = device.query_many(['FREQUENCY?'], parsers=float)
+    assert_equal(device.device.written, ['FREQUENCY 1000;:FREQUENCY?\n'])
+    assert_equal(actual_replies, (1000.0,))
+
+@pytest.mark.remote
+def test_state_cache():
+    device = SCPIDevice(lib_type='pyserial', device=ReplyingDevice(['1.5']))
+    device.cache_state = True
+    assert_equal(device.cached_query('voltage', 'VOLTAGE?', float), 1.5)
+    assert_equal(device.cached_query('voltage', 'VOLTAGE?', float), 1.5)
+    device.cached_write('voltage', 1.5, 'VOLTAGE 1.5')
+    device.cached_write('voltage', 2.0, 'VOLTAGE 2.0')
+    assert_equal(device.cached_query('voltage', 'VOLTAGE?', float), 2.0)
+    assert_equal(device.device.written, ['VOLTAGE?\n', 'VOLTAGE 2.0\n'])
+
+@pytest.mark.remote
+def test_state_cache_invalidate():
+    device = SCPIDevice(lib_type='pyserial', device=ReplyingDevice(['1.5', '2.5']))
+    device.cache_state = True
+    device.cached_query('voltage', 'VOLTAGE?', float)
+    device.invalidate()
+    assert_equal(device.cached_query('voltage', 'VOLTAGE?', float), 2.5)
+
+@pytest.mark.remote
+def test_state_cache_disabled():
+    device = SCPIDevice(lib_type='pyserial', device=ReplyingDevice(['1.5', '1.5']))
+    device.cached_query('voltage', 'VOLTAGE?', float)
+    device.cached_query('voltage', 'VOLTAGE?', float)
+    device.cached_write('voltage', 1.5, 'VOLTAGE 1.5')
+    assert_equal(device.device.written, ['VOLTAGE?\n', 'VOLTAGE?\n', 'VOLTAGE 1.5\n'])
+
+@pytest.mark.remote
+def test_refresh():
+    device = SCPIDevice(lib_type='pyserial', device=ReplyingDevice(['1.5;0']))
+    device.cache_state = True
+    device.STATE_QUERIES = {'voltage': ('VOLTAGE?', float), 'output_on': ('OUTPUT?', bool)}
+    actual_state = device.refresh()
+    assert_equal(actual_state, {'voltage': 1.5, 'output_on': False})
+    assert_equal(device.cached_query('output_on', 'OUTPUT?', bool), False)
+    assert_equal(device.device.written, ['VOLTAGE?;:OUTPUT?\n'])
+
+@pytest.mark.remote
+def test_read_binary_block():
+    payload = np.arange(10, dtype='<f4')
+    device = SCPIDevice(lib_type='pyserial', device=StreamingDevice(b'#240' + payload.tobytes()))
+    actual_data = device.read_binary_block('<f4')
+    assert_equal(actual_data, payload)
+
+@pytest.mark.remote
+def test_read_binary_block_out():
+    payload = np.arange(12, dtype=np.uint8)
+    out = np.zeros(20, dtype=np.uint8)
+    device = SCPIDevice(lib_type='pyserial', device=StreamingDevice(b'#' + payload.tobytes()))
+    actual_data = device.read_binary_block(
+            np.uint8, out=out, length_header=False, n_bytes=12)
+    assert_equal(actual_data, payload)
+    assert_equal(out[:12], payload)
+    assert np.shares_memory(actual_data, out)
+
+@pytest.mark.remote
+def test_read_binary_block_short():
+    device = SCPIDevice(lib_type='pyserial', device=StreamingDevice(b'#15abc'))
+    with pytest.raises(ValueError):
+        device.read_binary_block()
+
+@pytest.mark.remote
+def test_read_binary_block_chunks():
+    payload = np.arange(30, dtype=np.uint8)
+    device = SCPIDevice(lib_type='pyserial', device=StreamingDevice(b'#' + payload.tobytes(), chunk_size=100))
+    progress = []
+    actual_data = device.read_binary_block(
+            np.uint8, length_header=False, n_bytes=30, chunk_bytes=12,
+            progress=lambda n_read, n_bytes: progress.append((n_read, n_bytes)))
+    assert_equal(actual_data, payload)
+    assert_equal(progress, [(12, 30), (24, 30), (30, 30)])
+
+@pytest.mark.remote
+def test_read_binary_block_allow_short():
+    device = SCPIDevice(lib_type='pyserial', device=StreamingDevice(b'#' + bytes(range(10))))
+    actual_data = device.read_binary_block(
+            '<u4', length_header=False, n_bytes=16, timeout=0.01,
+            allow_short=True)
+    assert_equal(actual_data, np.frombuffer(bytes(range(8)), dtype='<u4'))
+
+@pytest.mark.remote
+def test_read_binary_block_bad_header():
+    device = SCPIDevice(lib_type='pyserial', device=StreamingDevice(b'x15abcde'))
+    with pytest.raises(ValueError):
+        device.read_binary_block()
+
+@pytest.mark.remote
+def test_timeout_visa():
+    device = SCPIDevice(lib_type='pyvisa', device=VisaStreamingDevice(b''))
+    device.timeout = 2.5
+    assert_equal(device.device.timeout, 2500)
+    assert_equal(device.timeout, 2.5)
+    device.timeout = None
+    assert_equal(device.device.timeout, None)
+    assert_equal(device.timeout, None)
+    device.device.timeout = float('inf')
+    assert_equal(device.timeout, None)
@@ -0,0 +1,63 @@
+from scippy.source.session_pool import acquire_session, register_session, release_session, pooled_resources, close_sessions, session_in_use, ResourceBusyError
+import pytest
+from numpy.testing import assert_equal
+
+class PooledDevice:
+    def __init__(self):
+        self.closed = False
+        self.timeout = 2000
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def pool():
+    close_sessions()
+    yield None
+    close_sessions()
+
+@pytest.mark.remote
+def test_acquire_by_name(pool):
+    device = PooledDevice()
+    register_session('GPIB0::24::INSTR', device, 'KEITHLEY')
+    release_session(device)
+    assert_equal(acquire_session(device_name='Agilent'), None)
+    assert_equal(acquire_session(), None)
+    assert_equal(acquire_session(device_name='KEITHLEY'), ('GPIB0::24::INSTR', device))
+    release_session(device)
+    assert_equal(acquire_session(resource_name='GPIB0::24::INSTR'), ('GPIB0::24::INSTR', device))
+    assert_equal(pooled_resources(), ['GPIB0::24::INSTR'])
+
+@pytest.mark.remote
+def test_release_keeps_session_open(pool):
+    device = PooledDevice()
+    register_session('USB0::1::INSTR', device, 'Agilent')
+    assert_equal(release_session(device), True)
+    assert_equal(device.closed, False)
+    assert_equal(acquire_session(device_name='Agilent'), ('USB0::1::INSTR', device))
+    assert_equal(release_session(PooledDevice()), False)
+
+@pytest.mark.remote
+def test_session_in_use_not_shared(pool):
+    device = PooledDevice()
+    register_session('USB0::1::INSTR', device, 'Agilent')
+    assert_equal(session_in_use('USB0::1::INSTR'), True)
+    with pytest.raises(ResourceBusyError):
+        acquire_session(device_name='Agilent')
+    with pytest.raises(ResourceBusyError):
+        acquire_session(resource_name='USB0::1::INSTR')
+    release_session(device)
+    assert_equal(session_in_use('USB0::1::INSTR'), False)
+    device.timeout = 10000
+    assert_equal(acquire_session(device_name='Agilent'), ('USB0::1::INSTR', device))
+    assert_equal(device.timeout, 2000)
+    with pytest.raises(ResourceBusyError):
+        acquire_session(device_name='Agilent')
+
+@pytest.mark.remote
+def test_close_sessions(pool):
+    device = PooledDevice()
+    register_session('USB0::1::INSTR', device, 'Agilent')
+    close_sessions()
+    assert_equal(device.closed, True)
+    assert_equal(pooled_resources(), [])
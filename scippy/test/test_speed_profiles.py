@@ -0,0 +1,33 @@
+import pytest
+from scippy import SPEED_PROFILES
+from scippy.source.speed_profiles import speed_settings, readings_per_second
+from numpy.testing import assert_equal, assert_allclose
+
+@pytest.mark.remote
+def test_speed_settings_override():
+    settings = speed_settings('fast', nplc=0.1)
+    assert_equal(settings['nplc'], 0.1)
+    assert_equal(settings['autozero'], False)
+    assert_equal(SPEED_PROFILES['fast']['nplc'], 0.01)
+
+@pytest.mark.remote
+def test_speed_settings_invalid():
+    with pytest.raises(ValueError):
+        speed_settings('ludicrous')
+    with pytest.raises(ValueError):
+        speed_settings('fast', aperture=1)
+
+@pytest.mark.remote
+def test_readings_per_second():
+    settings = speed_settings('fast')
+    assert_allclose(readings_per_second(settings, line_frequency=50, overhead=0),
+                    1 / (0.01 / 50))
+    settings = speed_settings('hi_accuracy')
+    assert_allclose(readings_per_second(settings, line_frequency=50, overhead=0),
+                    1 / (10 / 50 * 3 * 10 + 1e-3))
+
+@pytest.mark.remote
+def test_profiles_ordered():
+    rates = [readings_per_second(speed_settings(profile))
+             for profile in ['fast', 'normal', 'hi_accuracy']]
+    assert rates[0] > rates[1] > rates[2]